@@ -2,7 +2,7 @@
 # License OPL-1, See LICENSE file for full copyright and licensing details.
 {
     "name": "syscoon Financeinterface",
-    "version": "18.0.1.0.6",
+    "version": "18.0.1.0.12",
     "depends": ["account", "hr_expense", "syscoon_analytic_mixin", "syscoon_menu_rule"],
     "author": "syscoon Estonia OÜ",
     "license": "OPL-1",
@@ -13,6 +13,7 @@
     "category": "Accounting/Accounting",
     "data": [
         "data/syscoon_financeinterface_template_data.xml",
+        "data/ir_cron.xml",
         "reports/financeinterface_report.xml",
         "security/syscoon_financeinterface_security.xml",
         "security/ir.model.access.csv",
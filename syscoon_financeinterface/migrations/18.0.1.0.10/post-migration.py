@@ -0,0 +1,14 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+import logging
+
+from odoo import SUPERUSER_ID, api
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    _logger.info("post_init: Start: Compute the counterpart account of the moves")
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    count = env["account.move"]._backfill_export_account_counterpart()
+    _logger.info("post_init: End: Computed the counterpart account of %s moves", count)
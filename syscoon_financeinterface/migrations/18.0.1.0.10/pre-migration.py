@@ -0,0 +1,16 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    # Create the column of the now stored counterpart account, so the registry
+    # does not compute it for all moves at once, it is filled in post-migration
+    _logger.info("pre_init: Start: Create column export_account_counterpart")
+    cr.execute(
+        """ALTER TABLE account_move
+           ADD COLUMN IF NOT EXISTS export_account_counterpart integer"""
+    )
+    _logger.info("pre_init: End")
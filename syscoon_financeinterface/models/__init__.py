@@ -1,9 +1,12 @@
 # © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
 # License OPL-1, See LICENSE file for full copyright and licensing details.
+from . import account_account
 from . import account_analytic_plan
+from . import account_journal
 from . import account_move
 from . import syscoon_financeinterface
 from . import syscoon_financeinterface_bookingtext
+from . import syscoon_financeinterface_job
 from . import syscoon_financeinterface_template
 from . import res_company
 from . import res_config_settings
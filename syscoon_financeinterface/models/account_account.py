@@ -0,0 +1,16 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from odoo import models
+
+
+class AccountAccount(models.Model):
+    _inherit = "account.account"
+
+    def write(self, vals):
+        res = super().write(vals)
+        # _compute_export_datev_account of account.move reads the account type
+        if "account_type" in vals:
+            self.env["account.move"]._recompute_export_account_counterpart(
+                [("line_ids.account_id", "in", self.ids)]
+            )
+        return res
@@ -0,0 +1,18 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from odoo import models
+
+# journal fields _compute_export_datev_account of account.move reads
+COUNTERPART_FIELDS = {"type", "default_account_id"}
+
+
+class AccountJournal(models.Model):
+    _inherit = "account.journal"
+
+    def write(self, vals):
+        res = super().write(vals)
+        if COUNTERPART_FIELDS.intersection(vals):
+            self.env["account.move"]._recompute_export_account_counterpart(
+                [("journal_id", "in", self.ids)]
+            )
+        return res
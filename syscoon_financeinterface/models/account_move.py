@@ -14,6 +14,7 @@ class AccountMove(models.Model):
     export_account_counterpart = fields.Many2one(
         "account.account",
         compute="_compute_export_datev_account",
+        store=True,
         help="Technical field needed for move exports",
     )
     export_finance_interface_active = fields.Boolean(
@@ -30,41 +31,60 @@ class AccountMove(models.Model):
         exported_moves.show_reset_to_draft_button = False
         super(AccountMove, self - exported_moves)._compute_show_reset_to_draft_button()
 
-    def check_module_installed(self, module_name):
-        # Search for the module in the ir.module.module model
-        module = self.env["ir.module.module"].search([("name", "=", module_name)])
-
-        # Check if the module exists and is installed
-        return bool(module and module.state == "installed")
-
     def _get_default_accounts(self):
         """Get default accounts for the move"""
         if self.payment_ids[:1].payment_type == "inbound":
             # Use journal's default debit account or suspense account
             return [
                 self.journal_id.default_account_id.id
-                or self.env.company.account_journal_suspense_account_id.id,
+                or self.company_id.account_journal_suspense_account_id.id,
             ]
         if self.payment_ids[:1].payment_type == "outbound":
             # Use journal's default credit account or suspense account
             return [
                 self.journal_id.default_account_id.id
-                or self.env.company.account_journal_suspense_account_id.id,
+                or self.company_id.account_journal_suspense_account_id.id,
             ]
         return [
-            self.env.company.account_journal_suspense_account_id.id,
+            self.company_id.account_journal_suspense_account_id.id,
+        ]
+
+    def _get_export_datev_account_depends(self):
+        """The counterpart depends only on the fields of the move, its lines and
+        payments. Changes of the journal, account or company configuration are
+        applied to the moves not exported yet by _recompute_export_account_counterpart
+        """
+        depends = [
+            "move_type",
+            "journal_id",
+            "company_id",
+            "line_ids",
+            "line_ids.account_id",
+            "line_ids.debit",
+            "line_ids.credit",
+            "line_ids.tax_line_id",
+            "payment_ids.payment_type",
+            "export_manual",
+            "export_account_counterpart_manual",
         ]
+        # expense_sheet_id only exists if hr_expense is installed
+        if "expense_sheet_id" in self._fields:
+            depends.append("expense_sheet_id")
+        return depends
 
-    @api.depends("journal_id", "line_ids", "journal_id.default_account_id")
+    @api.depends(lambda self: self._get_export_datev_account_depends())
     def _compute_export_datev_account(self):  # noqa: C901
         """
         Set the account counterpart for the move autmaticaly
         """
+        # expense_sheet_id only exists if hr_expense is installed
+        has_expense_sheet = "expense_sheet_id" in self._fields
         for move in self:
             move.export_account_counterpart = False
             existing_accounts = move.line_ids.mapped("account_id")
+            default_accounts = move._get_default_accounts()
             payment_account = move.line_ids.filtered(
-                lambda line: line.account_id.id in move._get_default_accounts()
+                lambda line: line.account_id.id in default_accounts
             )
             # If move has an invoice, return invoice's account_id
             default_account = move.journal_id.default_account_id
@@ -90,18 +110,17 @@ class AccountMove(models.Model):
                     lambda line: line.account_id.account_type
                     in ("asset_receivable", "liability_payable")
                 )
-                check_hr_expense_installed = self.check_module_installed("hr_expense")
                 if payment_term_lines[:1].account_id:
                     move.export_account_counterpart = payment_term_lines[:1].account_id
                     continue
-                if check_hr_expense_installed and move.expense_sheet_id:
+                if has_expense_sheet and move.expense_sheet_id:
                     move.export_account_counterpart = default_account.id
                     continue
             # If the move is an automatic exchange rate entry, take the gain/loss account
             # set on the exchange journal
             if (
                 move.journal_id.type == "general"
-                and move.journal_id == self.env.company.currency_exchange_journal_id
+                and move.journal_id == move.company_id.currency_exchange_journal_id
             ):
                 accounts = [
                     move.company_id.income_currency_exchange_account_id,
@@ -161,6 +180,27 @@ class AccountMove(models.Model):
                     account_id = move.export_account_counterpart_manual.id
             move.export_account_counterpart = account_id
 
+    @api.model
+    def _backfill_export_account_counterpart(self, domain=None, batch_size=1000):
+        """Recomputes the stored counterpart account of the moves in batches,
+        used after the field became stored and after configuration changes"""
+        field = self._fields["export_account_counterpart"]
+        move_ids = self.search(domain or []).ids
+        for index in range(0, len(move_ids), batch_size):
+            moves = self.browse(move_ids[index : index + batch_size])
+            self.env.add_to_compute(field, moves)
+            moves.flush_recordset(["export_account_counterpart"])
+            self.env.invalidate_all()
+        return len(move_ids)
+
+    @api.model
+    def _recompute_export_account_counterpart(self, domain):
+        """Recomputes the counterpart of the moves of the domain that are not
+        exported yet, exported moves keep the counterpart they were exported with"""
+        return self._backfill_export_account_counterpart(
+            [("export_id", "=", False), *domain]
+        )
+
     def button_draft(self):
         super().button_draft()
         self.filtered(
@@ -7,6 +7,14 @@ from odoo import Command, api, fields, models
 
 _logger = logging.getLogger(__name__)
 
+# company fields _compute_export_datev_account of account.move reads
+COUNTERPART_FIELDS = {
+    "account_journal_suspense_account_id",
+    "currency_exchange_journal_id",
+    "income_currency_exchange_account_id",
+    "expense_currency_exchange_account_id",
+}
+
 
 class ResCompany(models.Model):
     _inherit = "res.company"
@@ -31,6 +39,13 @@ class ResCompany(models.Model):
     export_invoice_reset_active = fields.Boolean(
         string="Reset Invoices to Draft after Export"
     )
+    export_async = fields.Boolean(string="Export in Background")
+    export_chunk_size = fields.Integer(
+        string="Export Chunk Size",
+        default=1000,
+        help="Number of records that are exported and committed together in a "
+        "background export.",
+    )
 
     @api.model_create_multi
     def create(self, vals_list):
@@ -43,6 +58,10 @@ class ResCompany(models.Model):
         res = super().write(vals)
         if "export_finance_interface_active" in vals:
             self._set_visible_financeinterface_menu()
+        if COUNTERPART_FIELDS.intersection(vals):
+            self.env["account.move"]._recompute_export_account_counterpart(
+                [("company_id", "in", self.ids)]
+            )
         return res
 
     def _update_existing_financeinterface_export_sequence(self):
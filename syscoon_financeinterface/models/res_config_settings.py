@@ -21,3 +21,9 @@ class SyscoonFinanceinterfaceConfigSettings(models.TransientModel):
     company_export_invoice_reset_active = fields.Boolean(
         related="company_id.export_invoice_reset_active", readonly=False
     )
+    company_export_async = fields.Boolean(
+        related="company_id.export_async", readonly=False
+    )
+    company_export_chunk_size = fields.Integer(
+        related="company_id.export_chunk_size", readonly=False
+    )
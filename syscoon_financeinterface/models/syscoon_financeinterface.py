@@ -1,9 +1,9 @@
 # © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
 # License OPL-1, See LICENSE file for full copyright and licensing details.
 import logging
-import re
 from contextlib import suppress
 from decimal import Decimal
+from functools import lru_cache, partial
 from typing import Union
 
 from lxml import etree, html
@@ -16,6 +16,39 @@ from pytz import timezone
 _logger = logging.getLogger(__name__)
 
 
+@lru_cache
+def _rounding_factors(rounding):
+    """Returns the rounding as Decimal and its inverse if it is an integer"""
+    decimal_rounding = Decimal(str(rounding))
+    inverse = 1 / decimal_rounding
+    return decimal_rounding, int(inverse) if inverse == int(inverse) else None
+
+
+def _format_number(val, digits, is_float_string):
+    """Formats floats and float strings with the digits and a decimal comma,
+    the types of the export values are checked first to skip the float parsing"""
+    val_type = type(val)
+    if val_type is float:
+        return float_utils.float_repr(val, digits).replace(".", ",")
+    if val_type is str:
+        if "." not in val:
+            return val
+        try:
+            number = float(val)
+        except ValueError:
+            return val
+        return float_utils.float_repr(number, digits).replace(".", ",")
+    if val_type is int or val_type is bool or val is None:
+        return val
+    if is_float_string(val):
+        return float_utils.float_repr(float(val), digits).replace(".", ",")
+    return val
+
+
+def _format_base_amount(val, is_float_string):
+    return _format_number(val, 2, is_float_string) if val else ""
+
+
 class SyscoonFinanceinterface(models.Model):
     """The class syscoon.financeinterface is the central object to generate
     exports for the selected moves that can be used to be imported in the
@@ -77,16 +110,44 @@ class SyscoonFinanceinterface(models.Model):
         comodel_name="account.journal", string="Journals", default=_default_journal
     )
     state = fields.Selection(
-        selection=[("draft", "Draft"), ("export", "Exported")],
+        selection=[("draft", "Draft"), ("queued", "Queued"), ("export", "Exported")],
         default="draft",
         readonly=True,
         required=True,
     )
+    export_async = fields.Boolean(
+        string="Export in Background",
+        default=lambda self: self.env.company.export_async,
+        help="The export is processed in chunks by a scheduled action and the "
+        "user is notified when it is finished.",
+    )
+    job_ids = fields.One2many(
+        comodel_name="syscoon.financeinterface.job",
+        inverse_name="export_id",
+        readonly=True,
+    )
+    job_state = fields.Selection(
+        selection=[
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        compute="_compute_job_state",
+    )
+    job_progress = fields.Float(compute="_compute_job_state", string="Progress")
 
     def _compute_account_moves_count(self):
         for rec in self:
             rec.account_moves_count = len(rec.account_moves_ids)
 
+    @api.depends("job_ids.state", "job_ids.chunk_ids.state")
+    def _compute_job_state(self):
+        for rec in self:
+            job = rec.job_ids[:1]
+            rec.job_state = job.state
+            rec.job_progress = job.progress
+
     @api.constrains("start_date", "end_date", "mode")
     def _check_dates(self):
         """Check if the start date is smaller than the end date"""
@@ -146,13 +207,22 @@ class SyscoonFinanceinterface(models.Model):
 
     def _float_to_char(self, key, val):
         """Converts all floats of a line to char for using in DATEV ASCII Export"""
-        if not val and key == "Basis-Umsatz":
-            val = ""
-        if self._is_float_string(val) and key != "Kurs":
-            val = str(float_utils.float_repr(float(val), 2)).replace(".", ",")
-        if self._is_float_string(val) and key == "Kurs":
-            val = str(float_utils.float_repr(float(val), 4)).replace(".", ",")
-        return val
+        return self._get_column_formatter(key)(val)
+
+    def _get_column_formatter(self, key):
+        """Returns the function that formats the values of the column: amounts
+        with 2 digits, the exchange rate (Kurs) with 4 digits and an empty
+        Basis-Umsatz as empty string"""
+        is_float_string = self._is_float_string
+        if key == "Kurs":
+            return partial(_format_number, digits=4, is_float_string=is_float_string)
+        if key == "Basis-Umsatz":
+            return partial(_format_base_amount, is_float_string=is_float_string)
+        return partial(_format_number, digits=2, is_float_string=is_float_string)
+
+    def _prepare_column_formatters(self, columns):
+        """Returns the formatters of all columns of the export template"""
+        return {key: self._get_column_formatter(key) for key in columns}
 
     def _is_float_string(self, val):
         if isinstance(val, Union[int, float]):
@@ -166,49 +236,37 @@ class SyscoonFinanceinterface(models.Model):
     def _apply_template_config(self, move, line, data):
         """Converts all floats of a line to char for using in DATEV ASCII Export"""
         template_keys = data.get("template_keys", {})
+        formatters = data.setdefault("formatters", {})
         for key, val in line.items():
-            value = self._apply_template_line_config(move, template_keys, key, val)
-            line[key] = self._float_to_char(key, value)
+            if rule := template_keys.get(key):
+                val = rule(self, move, val)
+            if not (formatter := formatters.get(key)):
+                formatter = formatters[key] = self._get_column_formatter(key)
+            line[key] = formatter(val)
         return line
 
     def _apply_template_line_config(self, move, template_keys, key, value):
-        """Applies the regex to the value"""
-        values = template_keys.get(key, {})
-        value = self._apply_value_code_config(move, values.get("force_value"), key, value)
-        return self._apply_regex_config(values.get("expression"), key, value)
-
-    def _apply_value_code_config(self, move, key_code, key, value):
-        if not key_code or not isinstance(value, str):
-            return value
+        """Applies the compiled template rule of the key to the value, template_keys
+        are the rules returned by _template_rules of the template"""
+        rule = template_keys.get(key)
+        return rule(self, move, value) if rule else value
+
+    def _apply_value_code(self, move, rule, value):
+        """Runs the Force Value code of the rule with safe_eval"""
         eval_context = self._get_eval_context(move, value)
         # nocopy allows to return 'action'
-        safe_eval.safe_eval(key_code.strip(), eval_context, mode="exec", nocopy=True)
+        safe_eval.safe_eval(rule.code, eval_context, mode="exec", nocopy=True)
         return eval_context.get("value", value)
 
-    def _apply_regex_config(self, key_regex, key, value):
-        """Applies the regex to the value"""
-        if not key_regex:
-            return value
-        try:
-            # Check if the regex contains capturing groups
-            group_count = re.compile(key_regex).groups
-            if group_count > 0:
-                # Dynamically construct the replacement string to use all groups
-                replacement = "".join(rf"\{i}" for i in range(1, group_count + 1))
-                return re.sub(rf"{key_regex}", replacement, str(value))
-            # No groups, replace the entire match
-            return re.sub(rf"{key_regex}", "", str(value))
-        except Exception as e:
-            _logger.error(_("Financeinterface: %s"), e)
-            return value
-
     def currency_round(self, value, currency=False):
         if not currency:
             currency = self.env.company.currency_id
-        return float(
-            Decimal(str(currency.round(value) / currency.rounding))
-            * Decimal(str(currency.rounding))
-        )
+        quotient = currency.round(value) / currency.rounding
+        decimal_rounding, inverse = _rounding_factors(currency.rounding)
+        if inverse and quotient.is_integer() and abs(quotient) < 2**53:
+            # same float as the Decimal product, both are correctly rounded
+            return quotient / inverse
+        return float(Decimal(str(quotient)) * decimal_rounding)
 
     def convert_date(self, date, date_format="%d%m%y"):
         """Converts the date to the needed format for the export:
@@ -231,6 +289,22 @@ class SyscoonFinanceinterface(models.Model):
                 )
         return super().create(vals_list)
 
+    def _create_export_attachment(self, name, export_file):
+        """Creates the attachment of the export from a binary file object. The
+        finished file is read once and stored through the ORM, so the storage
+        of ir.attachment decides where it is written."""
+        self.ensure_one()
+        export_file.seek(0)
+        return self.env["ir.attachment"].create(
+            {
+                "name": name,
+                "res_model": self._name,
+                "res_id": self.id,
+                "type": "binary",
+                "raw": export_file.read(),
+            }
+        )
+
     def _get_report_base_filename(self):
         self.ensure_one()
         return self.name
@@ -260,23 +334,68 @@ class SyscoonFinanceinterface(models.Model):
 
     def action_export(self):
         """Set the export to exported state"""
-        if hasattr(self, f"_export_{self.mode}"):
-            getattr(self, f"_export_{self.mode}")()
-        else:
+        if not hasattr(self, f"_export_{self.mode}"):
             raise UserError(
                 _(
                     "The export method %s is not implemented. Please implement it in the model!",
                     self.mode,
                 )
             )
+        if self.export_async:
+            return self._queue_export()
+        getattr(self, f"_export_{self.mode}")()
         return self.write({"state": "export"})
 
     def action_draft(self):
         """Set the export to draft state"""
         if hasattr(self, f"_draft_{self.mode}"):
             getattr(self, f"_draft_{self.mode}")()
+        self.job_ids.unlink()
         return self.write({"state": "draft"})
 
+    def action_resume_export(self):
+        """Resumes the failed background export with its failed chunks"""
+        return self.job_ids.action_resume()
+
+    def _queue_export(self):
+        """Queues the export for the background processing. The records to export
+        are split into chunks right away, so missing records are reported to the
+        user immediately"""
+        self.ensure_one()
+        chunks = self._prepare_export_chunks()
+        self.env["syscoon.financeinterface.job"].create(
+            {
+                "export_id": self.id,
+                "chunk_ids": [
+                    Command.create({"sequence": sequence, "res_ids": res_ids})
+                    for sequence, res_ids in enumerate(chunks, start=1)
+                ],
+            }
+        )
+        self.env.ref("syscoon_financeinterface.ir_cron_process_export_jobs")._trigger()
+        return self.write({"state": "queued"})
+
+    def _prepare_export_chunks(self):
+        """Returns the lists of record ids that are exported together in one
+        committed chunk. Modes without chunk support are exported in one chunk."""
+        if hasattr(self, f"_prepare_chunks_{self.mode}"):
+            return getattr(self, f"_prepare_chunks_{self.mode}")()
+        return [[]]
+
+    def _process_export_chunk(self, chunk):
+        if hasattr(self, f"_export_chunk_{self.mode}"):
+            return getattr(self, f"_export_chunk_{self.mode}")(chunk)
+        return getattr(self, f"_export_{self.mode}")()
+
+    def _finalize_export(self, job):
+        if hasattr(self, f"_finalize_{self.mode}"):
+            return getattr(self, f"_finalize_{self.mode}")(job)
+        return True
+
+    def _split_export_chunks(self, ids):
+        size = self.company_id.export_chunk_size or 1000
+        return [ids[index : index + size] for index in range(0, len(ids), size)]
+
     def reset_export(self):
         self.action_draft()
         # Skip export if any warning/exception occurs in action_export
@@ -0,0 +1,171 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+import logging
+import threading
+
+from odoo import _, api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class SyscoonFinanceinterfaceJob(models.Model):
+    """Queue entry of an export that runs in the background. The export is split
+    into chunks which are processed and committed one by one by a cron job, so a
+    failed chunk can be resumed without restarting the whole export"""
+
+    _name = "syscoon.financeinterface.job"
+    _description = "syscoon Financial Interface Export Job"
+    _order = "id desc"
+
+    export_id = fields.Many2one(
+        comodel_name="syscoon.financeinterface", required=True, ondelete="cascade"
+    )
+    company_id = fields.Many2one(related="export_id.company_id", store=True)
+    user_id = fields.Many2one(
+        comodel_name="res.users", required=True, default=lambda self: self.env.user
+    )
+    state = fields.Selection(
+        selection=[
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        default="pending",
+        required=True,
+    )
+    chunk_ids = fields.One2many(
+        comodel_name="syscoon.financeinterface.job.chunk", inverse_name="job_id"
+    )
+    progress = fields.Float(compute="_compute_progress")
+    error = fields.Text()
+
+    @api.depends("chunk_ids.state")
+    def _compute_progress(self):
+        for job in self:
+            chunks = job.chunk_ids
+            done = chunks.filtered(lambda chunk: chunk.state == "done")
+            job.progress = 100.0 * len(done) / len(chunks) if chunks else 0.0
+
+    @api.model
+    def _cron_process_jobs(self):
+        """Processes the queued exports, jobs left running by an interrupted worker
+        continue with their first chunk that is not done"""
+        for job in self.search([("state", "in", ["pending", "running"])], order="id"):
+            job._process()
+
+    def _process(self):
+        self.ensure_one()
+        export = self.export_id.with_user(self.user_id).with_company(
+            self.export_id.company_id
+        )
+        if export.state != "queued":
+            return self.write({"state": "failed", "error": _("Export was reset.")})
+        self.write({"state": "running", "error": False})
+        self._commit()
+        for chunk in self.chunk_ids.filtered(lambda c: c.state != "done"):
+            try:
+                with self.env.cr.savepoint():
+                    export._process_export_chunk(chunk)
+                    chunk.write({"state": "done", "error": False})
+            except Exception as e:
+                _logger.exception("Financeinterface: export chunk %s failed", chunk.id)
+                chunk.write({"state": "failed", "error": str(e)})
+                self._fail(
+                    _(
+                        "Chunk %(chunk)s failed: %(error)s",
+                        chunk=chunk.sequence,
+                        error=e,
+                    )
+                )
+                return False
+            self._commit()
+        try:
+            with self.env.cr.savepoint():
+                export._finalize_export(self)
+        except Exception as e:
+            _logger.exception("Financeinterface: export job %s failed", self.id)
+            self._fail(str(e))
+            return False
+        self.write({"state": "done"})
+        self.chunk_ids._unlink_output()
+        export.write({"state": "export"})
+        export.message_post(
+            body=_("The export %(name)s is finished.", name=export.name),
+            partner_ids=self.user_id.partner_id.ids,
+        )
+        self._commit()
+        return True
+
+    def _fail(self, error):
+        self.write({"state": "failed", "error": error})
+        self.export_id.message_post(
+            body=_(
+                "The export %(name)s failed and can be resumed: %(error)s",
+                name=self.export_id.name,
+                error=error,
+            ),
+            partner_ids=self.user_id.partner_id.ids,
+        )
+        self._commit()
+
+    def _commit(self):
+        if not getattr(threading.current_thread(), "testing", False):
+            self.env.cr.commit()  # pylint: disable=invalid-commit
+
+    def action_resume(self):
+        """Restarts the failed jobs with their failed chunks"""
+        jobs = self.filtered(lambda job: job.state == "failed")
+        jobs.chunk_ids.filtered(lambda chunk: chunk.state == "failed").write(
+            {"state": "pending"}
+        )
+        jobs.write({"state": "pending", "error": False})
+        self.env.ref("syscoon_financeinterface.ir_cron_process_export_jobs")._trigger()
+        return True
+
+    def unlink(self):
+        self.chunk_ids._unlink_output()
+        return super().unlink()
+
+
+class SyscoonFinanceinterfaceJobChunk(models.Model):
+    _name = "syscoon.financeinterface.job.chunk"
+    _description = "syscoon Financial Interface Export Job Chunk"
+    _order = "sequence, id"
+
+    job_id = fields.Many2one(
+        comodel_name="syscoon.financeinterface.job", required=True, ondelete="cascade"
+    )
+    sequence = fields.Integer()
+    res_ids = fields.Json(help="Ids of the records that are exported by this chunk")
+    state = fields.Selection(
+        selection=[("pending", "Pending"), ("done", "Done"), ("failed", "Failed")],
+        default="pending",
+        required=True,
+    )
+    error = fields.Text()
+
+    def _get_output_attachments(self):
+        return self.env["ir.attachment"].search(
+            [("res_model", "=", self._name), ("res_id", "in", self.ids)]
+        )
+
+    def _get_output(self):
+        """Returns the raw output the chunk has stored as attachment"""
+        self.ensure_one()
+        return self._get_output_attachments()[:1].raw or b""
+
+    def _unlink_output(self):
+        return self._get_output_attachments().unlink()
+
+    def _set_output(self, content):
+        self.ensure_one()
+        return self.env["ir.attachment"].create(
+            {
+                "name": f"chunk_{self.job_id.id}_{self.sequence}",
+                "res_model": self._name,
+                "res_id": self.id,
+                "type": "binary",
+                "raw": content,
+            }
+        )
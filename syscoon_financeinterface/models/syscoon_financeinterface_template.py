@@ -1,6 +1,55 @@
 # © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
 # License OPL-1, See LICENSE file for full copyright and licensing details.
-from odoo import fields, models
+import logging
+import re
+
+from odoo import _, api, fields, models, tools
+
+_logger = logging.getLogger(__name__)
+
+# fields of the template lines the cached rules of _template_rules are built from
+RULE_FIELDS = {"name", "sequence", "expression", "type", "value_code", "template_id"}
+
+
+class TemplateRule:
+    """Compiled template line: the regex is compiled once per template version,
+    the Force Value code is run by safe_eval and the rule is applied by calling it"""
+
+    __slots__ = ("expression", "force_value", "pattern", "replacement", "code")
+
+    def __init__(self, expression=False, force_value=False):
+        self.expression = expression
+        self.force_value = force_value
+        self.pattern = None
+        self.replacement = ""
+        self.code = None
+        if expression:
+            try:
+                self.pattern = re.compile(expression)
+            except re.error as e:
+                _logger.error(_("Financeinterface: %s"), e)
+            else:
+                # Use all capturing groups as replacement, else remove the match
+                self.replacement = "".join(
+                    rf"\{i}" for i in range(1, self.pattern.groups + 1)
+                )
+        if force_value:
+            self.code = force_value.strip()
+
+    def __call__(self, interface, move, value):
+        if self.code is not None and isinstance(value, str):
+            value = interface._apply_value_code(move, self, value)
+        return self.substitute(value)
+
+    def substitute(self, value):
+        """Applies the regex to the value"""
+        if self.pattern is None:
+            return value
+        try:
+            return self.pattern.sub(self.replacement, str(value))
+        except Exception as e:
+            _logger.error(_("Financeinterface: %s"), e)
+            return value
 
 
 class SyscoonFinanceinterfaceTemplate(models.Model):
@@ -39,6 +88,16 @@ class SyscoonFinanceinterfaceTemplate(models.Model):
         """Returns the name and description of syscoon.financeinterface.template.line as a dictionary."""
         return self.xml_line_ids._get_vals()
 
+    @tools.ormcache("self.id", "line_type")
+    def _template_rules(self, line_type="ascii"):
+        """Returns the compiled rules of the template lines by their name, cached
+        until a rule field of one of its lines is changed"""
+        return {
+            name: TemplateRule(vals.get("expression"), vals.get("force_value"))
+            for name, vals in self._template_vals(line_type=line_type).items()
+            if vals.get("expression") or vals.get("force_value")
+        }
+
 
 class SyscoonFinanceinterfaceTemplateLine(models.Model):
     """The class syscoon.financeinterface is the central object to generate
@@ -71,6 +130,20 @@ class SyscoonFinanceinterfaceTemplateLine(models.Model):
         ondelete="cascade",
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env.registry.clear_cache()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if RULE_FIELDS.intersection(vals):
+            self.env.registry.clear_cache()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env.registry.clear_cache()
+        return super().unlink()
+
     def _get_vals(self):
         return {
             line.name: {"expression": line.expression, "force_value": line.value_code}
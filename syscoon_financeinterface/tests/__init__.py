@@ -3,3 +3,5 @@
 
 from . import test_account_analytic_plan
 from . import test_account_move
+from . import test_financeinterface_template
+from . import test_financeinterface
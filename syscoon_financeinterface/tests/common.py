@@ -0,0 +1,188 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+from odoo import Command, fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.modules.module import get_manifest
+
+_logger = logging.getLogger(__name__)
+
+
+class DatevBenchmarkCommon(AccountTestInvoicingCommon):
+    """Generates synthetic accounting data for the export benchmarks and records
+    query count, wall time and peak memory of the measured exports.
+
+    The scale and the result file are set with the environment variables
+    DATEV_BENCH_SCALE (number of invoices, default 200) and DATEV_BENCH_OUTPUT
+    (default datev_bench.json in the temp directory). Every run is appended to
+    the result file, so the results can be compared across versions."""
+
+    BENCH_MODULE = "syscoon_financeinterface"
+    LINES_PER_INVOICE = 3
+    PARTNERS_PER_INVOICE = 0.1
+    PAID_INVOICE_RATIO = 0.5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.bench_scale = int(os.environ.get("DATEV_BENCH_SCALE", 200))
+        cls.bench_output = os.environ.get("DATEV_BENCH_OUTPUT") or os.path.join(
+            tempfile.gettempdir(), "datev_bench.json"
+        )
+        cls.bench_date = fields.Date.from_string("2024-01-01")
+        cls.env.company.export_finance_interface_active = True
+        if "datev_checks_enabled" in cls.env.company._fields:
+            cls.env.company.datev_checks_enabled = False
+
+    @classmethod
+    def _generate_bench_partners(cls, count):
+        partners = cls.env["res.partner"].create(
+            [
+                {
+                    "name": f"Bench Partner {index}",
+                    "is_company": True,
+                    "street": f"Benchstraße {index}",
+                    "zip": "10115",
+                    "city": "Berlin",
+                    "country_id": cls.env.ref("base.de").id,
+                }
+                for index in range(count)
+            ]
+        )
+        if "debitor_number" in partners._fields:
+            for index, partner in enumerate(partners):
+                partner.write(
+                    {
+                        "debitor_number": str(10000 + index),
+                        "creditor_number": str(70000 + index),
+                    }
+                )
+        return partners
+
+    @classmethod
+    def _generate_bench_analytic_accounts(cls, count=5):
+        plan = cls.env["account.analytic.plan"].create(
+            {"name": "Bench KOST1", "datev_cost_center": "add_to_kost1"}
+        )
+        return cls.env["account.analytic.account"].create(
+            [
+                {
+                    "name": f"Bench Cost Center {index}",
+                    "code": str(100 + index),
+                    "plan_id": plan.id,
+                }
+                for index in range(count)
+            ]
+        )
+
+    @classmethod
+    def _prepare_bench_invoice_vals(cls, index, partners, analytic_accounts):
+        move_type = "out_invoice" if index % 2 else "in_invoice"
+        tax = cls.company_data[
+            "default_tax_sale" if move_type == "out_invoice" else "default_tax_purchase"
+        ]
+        invoice_date = cls.bench_date.replace(day=index % 28 + 1)
+        analytic = analytic_accounts[index % len(analytic_accounts)]
+        return {
+            "move_type": move_type,
+            "partner_id": partners[index % len(partners)].id,
+            "invoice_date": invoice_date,
+            "date": invoice_date,
+            "ref": f"BENCH-{index}",
+            "invoice_line_ids": [
+                Command.create(
+                    {
+                        "name": f"Bench Line {line}",
+                        "quantity": line + 1,
+                        "price_unit": 10.0 * (index % 50 + 1) + line,
+                        "tax_ids": [Command.set(tax.ids)],
+                        "analytic_distribution": {str(analytic.id): 100},
+                    }
+                )
+                for line in range(cls.LINES_PER_INVOICE)
+            ],
+        }
+
+    @classmethod
+    def _generate_bench_data(cls, count=None):
+        """Creates and posts the invoices with analytic distributions and pays a
+        part of them, returns the posted invoices and the payments"""
+        count = count or cls.bench_scale
+        partners = cls._generate_bench_partners(
+            max(int(count * cls.PARTNERS_PER_INVOICE), 1)
+        )
+        analytic_accounts = cls._generate_bench_analytic_accounts()
+        invoices = cls.env["account.move"].create(
+            [
+                cls._prepare_bench_invoice_vals(index, partners, analytic_accounts)
+                for index in range(count)
+            ]
+        )
+        invoices.action_post()
+        payments = cls.env["account.payment"]
+        paid = invoices[: int(count * cls.PAID_INVOICE_RATIO)]
+        for move_type in ("out_invoice", "in_invoice"):
+            to_pay = paid.filtered(lambda move, t=move_type: move.move_type == t)
+            if not to_pay:
+                continue
+            payments |= (
+                cls.env["account.payment.register"]
+                .with_context(active_model="account.move", active_ids=to_pay.ids)
+                .create({"payment_date": cls.bench_date, "group_payment": False})
+                ._create_payments()
+            )
+        _logger.info(
+            "DATEV benchmark: generated %s invoices, %s payments, %s partners",
+            len(invoices),
+            len(payments),
+            len(partners),
+        )
+        return invoices, payments
+
+    def _measure_export(self, name, export, count):
+        """Runs the export and records its query count, wall time and peak memory"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        tracemalloc.start()
+        start = time.perf_counter()
+        export()
+        self.env.flush_all()
+        wall_time = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result = {
+            "name": name,
+            "module": self.BENCH_MODULE,
+            "version": get_manifest(self.BENCH_MODULE).get("version"),
+            "date": fields.Datetime.to_string(fields.Datetime.now()),
+            "records": count,
+            "queries": self.env.cr.sql_log_count - queries,
+            "wall_time": round(wall_time, 4),
+            "peak_memory": peak_memory,
+        }
+        _logger.info(
+            "DATEV benchmark %s: %s records, %s queries, %.3fs, %.1f MiB peak",
+            name,
+            count,
+            result["queries"],
+            wall_time,
+            peak_memory / 1024 / 1024,
+        )
+        self._write_bench_result(result)
+        return result
+
+    def _write_bench_result(self, result):
+        results = []
+        if os.path.exists(self.bench_output):
+            with open(self.bench_output, encoding="utf-8") as bench_file:
+                results = json.load(bench_file)
+        results.append(result)
+        with open(self.bench_output, "w", encoding="utf-8") as bench_file:
+            json.dump(results, bench_file, indent=2)
@@ -123,3 +123,85 @@ class TestAccountMoveFinanceInterface(AccountTestInvoicingCommon):
         )
         self.assertNotEqual(self.test_move.export_account_counterpart, False)
         _logger.info("========== DONE test_compute_export_account_counterpart ==========")
+
+    def test_backfill_export_account_counterpart(self):
+        _logger.info(
+            "========== START test_backfill_export_account_counterpart =========="
+        )
+        counterpart = self.test_move.export_account_counterpart
+        self.env.cr.execute(
+            "UPDATE account_move SET export_account_counterpart = NULL WHERE id = %s",
+            (self.test_move.id,),
+        )
+        self.env.invalidate_all()
+        self.assertFalse(self.test_move.export_account_counterpart)
+        self.env["account.move"]._backfill_export_account_counterpart(
+            [("id", "=", self.test_move.id)]
+        )
+        self.assertEqual(self.test_move.export_account_counterpart, counterpart)
+        _logger.info(
+            "========== DONE test_backfill_export_account_counterpart =========="
+        )
+
+    def test_recompute_export_account_counterpart(self):
+        _logger.info(
+            "========== START test_recompute_export_account_counterpart =========="
+        )
+        company = self.company_data["company"]
+        exchange_account = company.income_currency_exchange_account_id
+        expense_account = self.company_data["default_account_expense"]
+        moves = self.env["account.move"].create(
+            [
+                {
+                    "move_type": "entry",
+                    "journal_id": self.company_data["default_journal_misc"].id,
+                    "date": fields.Date.from_string("2024-01-01"),
+                    "line_ids": [
+                        (
+                            0,
+                            None,
+                            {
+                                "name": "exchange line",
+                                "account_id": exchange_account.id,
+                                "debit": 100.0,
+                            },
+                        ),
+                        (
+                            0,
+                            None,
+                            {
+                                "name": "revenue line",
+                                "account_id": self.company_data[
+                                    "default_account_revenue"
+                                ].id,
+                                "debit": 100.0,
+                            },
+                        ),
+                        (
+                            0,
+                            None,
+                            {
+                                "name": "counterpart line",
+                                "account_id": expense_account.id,
+                                "credit": 200.0,
+                            },
+                        ),
+                    ],
+                }
+            ]
+            * 2
+        )
+        self.assertEqual(moves.export_account_counterpart, expense_account)
+        moves[1].export_id = self.env["syscoon.financeinterface"].create(
+            {
+                "name": "Export test name",
+                "mode": "none",
+                "period": "2024-01-31 - 2024-12-31",
+            }
+        )
+        company.currency_exchange_journal_id = self.company_data["default_journal_misc"]
+        self.assertEqual(moves[0].export_account_counterpart, exchange_account)
+        self.assertEqual(moves[1].export_account_counterpart, expense_account)
+        _logger.info(
+            "========== DONE test_recompute_export_account_counterpart =========="
+        )
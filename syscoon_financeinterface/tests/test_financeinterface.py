@@ -0,0 +1,33 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from decimal import Decimal
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged("syscoon")
+class TestFinanceinterfaceFormatting(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.interface = self.env["syscoon.financeinterface"]
+
+    def test_float_to_char(self):
+        to_char = self.interface._float_to_char
+        self.assertEqual(to_char("Umsatz (ohne Soll/Haben-Kz)", 100.0), "100,00")
+        self.assertEqual(to_char("Umsatz (ohne Soll/Haben-Kz)", "12.345"), "12,35")
+        self.assertEqual(to_char("Kurs", 1.23456789), "1,2346")
+        self.assertEqual(to_char("Basis-Umsatz", 0.0), "")
+        self.assertEqual(to_char("Basis-Umsatz", 5.5), "5,50")
+        self.assertEqual(to_char("Konto", "1200"), "1200")
+        self.assertEqual(to_char("Festschreibung", 1), 1)
+        self.assertEqual(to_char("Buchungstext", "Rg. 2024"), "Rg. 2024")
+        self.assertEqual(to_char("Buchungstext", False), False)
+
+    def test_currency_round(self):
+        currency = self.env.company.currency_id
+        for value in (0.0, 1.005, -12.345, 123456.789, 0.1 + 0.2):
+            expected = float(
+                Decimal(str(currency.round(value) / currency.rounding))
+                * Decimal(str(currency.rounding))
+            )
+            self.assertEqual(self.interface.currency_round(value, currency), expected)
@@ -0,0 +1,62 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged("syscoon")
+class TestFinanceinterfaceTemplate(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.interface = self.env["syscoon.financeinterface"]
+        self.template = self.env["syscoon.financeinterface.template"].create(
+            {
+                "name": "Test Template",
+                "line_ids": [
+                    (0, 0, {"name": "Belegfeld 1", "sequence": 1, "expression": "-"}),
+                    (
+                        0,
+                        0,
+                        {
+                            "name": "Buchungstext",
+                            "sequence": 2,
+                            "expression": r"(\w+) (\w+)",
+                            "value_code": "value = current_value.upper()",
+                        },
+                    ),
+                    (0, 0, {"name": "Konto", "sequence": 3}),
+                ],
+            }
+        )
+
+    def test_template_rules(self):
+        rules = self.template._template_rules(line_type="ascii")
+        self.assertEqual(set(rules), {"Belegfeld 1", "Buchungstext"})
+        self.assertIs(rules, self.template._template_rules(line_type="ascii"))
+        move = self.env["account.move"]
+        apply = self.interface._apply_template_line_config
+        self.assertEqual(apply(move, rules, "Belegfeld 1", "INV-2024-1"), "INV20241")
+        self.assertEqual(apply(move, rules, "Buchungstext", "foo bar"), "FOOBAR")
+        self.assertEqual(apply(move, rules, "Konto", 1200), 1200)
+
+    def test_template_rules_invalidation(self):
+        rules = self.template._template_rules(line_type="ascii")
+        self.template.line_ids[0].expression = "/"
+        new_rules = self.template._template_rules(line_type="ascii")
+        self.assertIsNot(rules, new_rules)
+        self.assertEqual(
+            new_rules["Belegfeld 1"](self.interface, False, "INV/2024/1"), "INV20241"
+        )
+
+    def test_template_rules_description(self):
+        rules = self.template._template_rules(line_type="ascii")
+        self.template.line_ids[0].description = "Only documentation"
+        self.assertIs(rules, self.template._template_rules(line_type="ascii"))
+
+    def test_template_rules_invalid_force_value(self):
+        self.template.line_ids[2].value_code = "value = ("
+        rules = self.template._template_rules(line_type="ascii")
+        move = self.env["account.move"]
+        apply = self.interface._apply_template_line_config
+        self.assertEqual(apply(move, rules, "Belegfeld 1", "INV-2024-1"), "INV20241")
+        with self.assertRaises((SyntaxError, ValueError)):
+            apply(move, rules, "Konto", "1200")
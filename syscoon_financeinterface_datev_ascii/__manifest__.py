@@ -2,7 +2,7 @@
 # License OPL-1, See LICENSE file for full copyright and licensing details.
 {
     "name": "syscoon Finanzinterface - DATEV ASCII Export",
-    "version": "18.0.1.1.5",
+    "version": "18.0.1.1.11",
     "author": "syscoon Estonia OÜ",
     "license": "OPL-1",
     "website": "https://syscoon.com",
@@ -41,18 +41,15 @@ class AccountMove(models.Model):
         return errors
 
     def _assign_datev_values(self):
+        template = self.env["syscoon.financeinterface"]._export_template()
+        rules = template._template_rules(line_type="ascii")
+
         @lru_cache
         def _get_val(key, value):
             if not value:
                 return ""
-            finance_interface = self.env["syscoon.financeinterface"]
-            template = finance_interface._export_template()
-            ascii_vals = template._template_vals(line_type="ascii")
-            exprission_vals = ascii_vals.get(key, {}).get("expression")
-            try:
-                return finance_interface._apply_regex_config(exprission_vals, key, value)
-            except Exception:
-                return value
+            rule = rules.get(key)
+            return rule.substitute(value) if rule else value
 
         for move in self:
             if move.datev_checks_enabled:
@@ -114,26 +111,96 @@ class AccountMove(models.Model):
     # ------------------------------------------
     # DATEV Export
     # ------------------------------------------
+    def _prepare_datev_export_cache(self):
+        """Reads all relations the DATEV ASCII export needs for the moves in a few
+        set-based reads and returns the per move and per line values as maps"""
+        lines = self.line_ids
+        self.fetch(
+            [fname for fname in self._datev_export_move_fields() if fname in self._fields]
+        )
+        lines.fetch(lines._datev_export_line_fields())
+        counterparts = {move.id: move.export_account_counterpart for move in self}
+        accounts = lines.account_id.union(*counterparts.values())
+        accounts.fetch(
+            [
+                "code",
+                "account_type",
+                "datev_automatic_account",
+                "datev_no_tax",
+                "datev_vatid_required",
+            ]
+        )
+        lines.tax_ids.fetch(
+            ["amount", "datev_tax_key", "datev_tax_case", "datev_country_id"]
+        )
+        partners = lines.partner_id | self.partner_id | self.partner_shipping_id
+        partners.fetch(["vat", "commercial_partner_id"])
+        partners.commercial_partner_id.fetch(["creditor_number", "debitor_number"])
+        bookingtext = lines._prepare_datev_bookingtext_recipes()
+        for field_path in bookingtext["fields"]:
+            # reads or computes the values of all lines at once
+            lines.mapped(field_path)
+        partner_line_ids = {move.id: [] for move in self}
+        for line in lines.filtered("partner_id"):
+            partner_line_ids[line.move_id.id].append(line.id)
+        return {
+            "counterparts": counterparts,
+            "partner_lines": {
+                move_id: lines.browse(line_ids)
+                for move_id, line_ids in partner_line_ids.items()
+            },
+            "analytic_accounts": lines._prepare_datev_analytic_accounts(),
+            "bookingtext": bookingtext,
+            "origins": self._prepare_datev_origin_moves(),
+        }
+
+    def _datev_export_move_fields(self):
+        return [
+            "name",
+            "ref",
+            "date",
+            "move_type",
+            "journal_id",
+            "company_id",
+            "partner_id",
+            "partner_shipping_id",
+            "invoice_date",
+            "invoice_date_due",
+            "invoice_origin",
+            "invoice_payment_term_id",
+            "delivery_date",
+            "datev_ref",
+            "datev_bedi",
+            "activate_service_date",
+            "service_date_type",
+            "service_end_date",
+            "service_delivery_date",
+            "sdd_mandate_id",
+            "export_account_counterpart",
+        ]
+
     def generate_export_lines(self, data):
-        """Checks if lines are exportable and inits the generation of the export line"""
+        """Checks if lines are exportable and inits the generation of the export line.
+        The ids of the generated lines are indexed per move in data["move_lines"]"""
+        move_line_ids = data["move_lines"].setdefault(self.id, [])
         for line in self.line_ids:
-            if line._is_datev_invalid_line():
+            if line._is_datev_invalid_line(data):
                 continue
-            datev_move = self._datev_move(line)
+            datev_move = self._datev_move(line, data)
             line_data = {
                 "move": self,
                 "datev_move": datev_move,
                 "export": data["interface"].export_template(),
             }
-            data["lines"].setdefault(line.id, line_data)
+            if line.id not in data["lines"]:
+                data["lines"][line.id] = line_data
+                move_line_ids.append(line.id)
             line.generate_export_line(data)
         self.group_converted_move_lines(data)
 
     def group_converted_move_lines(self, data):
         lines = [
-            data["lines"][ml]["export"]
-            for ml in data["lines"]
-            if data["lines"][ml]["move"].id == self.id
+            data["lines"][ml]["export"] for ml in data["move_lines"].get(self.id, [])
         ]
         if not self.journal_id.datev_ascii_group_moves:
             data["grouped_lines"] += [
@@ -169,9 +236,11 @@ class AccountMove(models.Model):
             "Gegenkonto (ohne BU-Schlüssel)",
         ]
 
-    def _datev_move(self, line):
+    def _datev_move(self, line, data=None):
+        origins = line._get_datev_cache(data, "origins")
+        if origins is not None and line.id in origins:
+            return origins[line.id]
         move_types = self.get_sale_types() + self.get_purchase_types()
-        is_asset = "asset_id" in self._fields
         aml_obj = self.env["account.move.line"]
         move = self
         if reconciled_line := aml_obj.search(
@@ -183,7 +252,64 @@ class AccountMove(models.Model):
             limit=1,
         ):
             move = reconciled_line.move_id
-        elif is_asset and self.asset_id.original_move_line_ids:
-            move = self.asset_id.original_move_line_ids.move_id[:1]
+        else:
+            move = self._datev_asset_move()
         move = move._datev_original_moves()[:1]
         return move
+
+    def _datev_asset_move(self):
+        if "asset_id" in self._fields and self.asset_id.original_move_line_ids:
+            return self.asset_id.original_move_line_ids.move_id[:1]
+        return self
+
+    def _prepare_datev_origin_moves(self):
+        """Resolves the move of the original document of all lines of the moves as
+        _datev_move does per line, with one query over the partial reconciliations
+        and one batch computation of the reconciled invoices of the payments"""
+        reconciled = self._get_datev_reconciled_moves()
+        origins = {}
+        for line in self.line_ids:
+            if line.id in reconciled:
+                origins[line.id] = self.browse(reconciled[line.id])
+            else:
+                origins[line.id] = line.move_id._datev_asset_move()
+        moves = self.browse().union(*origins.values())
+        payments = moves.payment_ids
+        payments.mapped("reconciled_bill_ids")
+        payments.mapped("reconciled_invoice_ids")
+        original_moves = {move.id: move._datev_original_moves()[:1] for move in moves}
+        return {line_id: original_moves[move.id] for line_id, move in origins.items()}
+
+    def _get_datev_reconciled_moves(self):
+        """Returns the first reconciled sale or purchase move of another move per
+        line id, with the order of account.move.line like _datev_move"""
+        lines = self.line_ids.filtered("account_id.reconcile")
+        if not lines:
+            return {}
+        self.env["account.move"].flush_model(["move_type"])
+        self.env["account.move.line"].flush_model(
+            ["move_id", "credit", "date", "move_name"]
+        )
+        self.env["account.partial.reconcile"].flush_model(
+            ["debit_move_id", "credit_move_id"]
+        )
+        move_types = self.get_sale_types() + self.get_purchase_types()
+        self.env.cr.execute(
+            """SELECT DISTINCT ON (line.id) line.id, counterpart.move_id
+                 FROM account_move_line line
+                 JOIN account_partial_reconcile part
+                   ON (line.credit > 0 AND part.credit_move_id = line.id)
+                   OR (line.credit <= 0 AND part.debit_move_id = line.id)
+                 JOIN account_move_line counterpart
+                   ON counterpart.id = CASE WHEN line.credit > 0
+                                            THEN part.debit_move_id
+                                            ELSE part.credit_move_id END
+                 JOIN account_move move ON move.id = counterpart.move_id
+                WHERE line.id IN %s
+                  AND counterpart.move_id != line.move_id
+                  AND move.move_type IN %s
+             ORDER BY line.id, counterpart.date DESC,
+                      counterpart.move_name DESC, counterpart.id""",
+            (tuple(lines.ids), tuple(move_types)),
+        )
+        return dict(self.env.cr.fetchall())
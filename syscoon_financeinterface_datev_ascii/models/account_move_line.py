@@ -1,5 +1,6 @@
 # © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
 # License OPL-1, See LICENSE file for full copyright and licensing details.
+from operator import attrgetter
 
 from odoo import _, models
 from odoo.tools import float_is_zero
@@ -8,13 +9,13 @@ from odoo.tools import float_is_zero
 class AccountMoveLine(models.Model):
     _inherit = "account.move.line"
 
-    def _is_datev_invalid_line(self):
+    def _is_datev_invalid_line(self, data=None):
         return (
             (
                 self.env.company.datev_export_method == "gross"
                 and self.tax_repartition_line_id
             )
-            or self.account_id.id == self.move_id.export_account_counterpart.id
+            or self.account_id.id == self._get_datev_counterpart(data).id
             or float_is_zero(self.balance, precision_rounding=self.currency_id.rounding)
         )
 
@@ -114,7 +115,7 @@ class AccountMoveLine(models.Model):
                 if (
                     self.account_id.datev_automatic_account
                     and self.account_id.datev_no_tax
-                ) or self.move_id.export_account_counterpart.datev_no_tax:
+                ) or self._get_datev_counterpart(data).datev_no_tax:
                     export["BU-Schlüssel"] = "40"
         if is_curr_diff:
             base_total = abs(self.balance)
@@ -199,7 +200,7 @@ class AccountMoveLine(models.Model):
         if not self.analytic_distribution:
             return
         export = data["lines"][self.id]["export"]
-        for analytic_account_id in self._fetch_analytic_accounts():
+        for analytic_account_id in self._get_datev_analytic_accounts(data):
             if analytic_account_id.plan_id.datev_cost_center == "add_to_kost1":
                 export["KOST1 - Kostenstelle"] = analytic_account_id.code
             if analytic_account_id.plan_id.datev_cost_center == "add_to_kost2":
@@ -210,9 +211,9 @@ class AccountMoveLine(models.Model):
         export = data["lines"][self.id]["export"]
         _rlzero = interface._remove_leading_zero
         account_type = self.account_id.account_type
-        counterpart_account = self.move_id.export_account_counterpart
+        counterpart_account = self._get_datev_counterpart(data)
         counterpart_type = counterpart_account.account_type
-        lines_with_partner = self._get_lines_with_partner()
+        lines_with_partner = self._get_lines_with_partner(data)
         is_one_partner = self.partner_id or len(lines_with_partner) == 1
         line_partner = self.partner_id.commercial_partner_id
         partner = lines_with_partner[:1].partner_id.commercial_partner_id
@@ -234,15 +235,9 @@ class AccountMoveLine(models.Model):
 
     def _apply_buchungstext(self, data):
         export = data["lines"][self.id]["export"]
-        bookingtext_obj = self.env["syscoon.financeinterface.bookingtext.config"].sudo()
-        labels = bookingtext_obj.search(
-            [("journal_id", "=", self.journal_id.id)], order="sequence asc"
-        )
-        if not labels:
-            labels = bookingtext_obj.search([], order="sequence asc")
         bookingtext = []
-        for label in labels:
-            if value := self.get_field(label.field):
+        for get_value in self._get_datev_bookingtext_recipe(data):
+            if value := get_value(self):
                 bookingtext.append(value)
         bookingtext = ", ".join(bookingtext) if bookingtext else self.name
         export["Buchungstext"] = (bookingtext or self.move_id.name)[:60]
@@ -258,15 +253,93 @@ class AccountMoveLine(models.Model):
             export["SEPA-Mandatsreferenz"] = self.move_id.sdd_mandate_id.name or ""
 
     # -------------helpers-------------------
-    def _get_lines_with_partner(self):
-        return self.move_id.line_ids.filtered(
-            lambda l: l.partner_id and l.partner_id != self.partner_id
+    def _datev_export_line_fields(self):
+        return [
+            "move_id",
+            "name",
+            "journal_id",
+            "company_id",
+            "account_id",
+            "partner_id",
+            "currency_id",
+            "tax_ids",
+            "tax_repartition_line_id",
+            "debit",
+            "credit",
+            "balance",
+            "amount_currency",
+            "analytic_distribution",
+        ]
+
+    def _prepare_datev_analytic_accounts(self):
+        """Returns the analytic accounts of the distribution of each line, checked
+        for existence with a single query for all lines"""
+        analytic_obj = self.env["account.analytic.account"]
+        analytic_ids = {}
+        for line in self.filtered("analytic_distribution"):
+            analytic_ids[line.id] = [
+                int(analytic_id)
+                for analytic_keys in line.analytic_distribution
+                for analytic_id in analytic_keys.split(",")
+            ]
+        existing = analytic_obj.browse(
+            {analytic_id for ids in analytic_ids.values() for analytic_id in ids}
+        ).exists()
+        existing.fetch(["code", "plan_id"])
+        existing.plan_id.fetch(["datev_cost_center"])
+        existing_ids = set(existing.ids)
+        return {
+            line_id: analytic_obj.browse([i for i in ids if i in existing_ids])
+            for line_id, ids in analytic_ids.items()
+        }
+
+    def _prepare_datev_bookingtext_recipes(self):
+        """Reads the booking text configuration once and returns the getters of
+        the configured fields per journal and of all configurations as fallback"""
+        configs = (
+            self.env["syscoon.financeinterface.bookingtext.config"]
+            .sudo()
+            .search([], order="sequence asc")
+            .filtered("field")
         )
+        journals = {}
+        for config in configs.filtered("journal_id"):
+            journals.setdefault(config.journal_id.id, []).append(
+                attrgetter(config.field)
+            )
+        return {
+            "fields": set(configs.mapped("field")),
+            "journals": journals,
+            "all": [attrgetter(config.field) for config in configs],
+        }
 
-    def get_field(self, field_name):
-        for part in field_name.split("."):
-            if part in ["move_id", "partner_id"]:
-                self = getattr(self, part)
-            else:
-                value = getattr(self, part)
-        return value
+    def _get_datev_bookingtext_recipe(self, data=None):
+        recipes = self._get_datev_cache(data, "bookingtext")
+        if recipes is None:
+            recipes = self._prepare_datev_bookingtext_recipes()
+        return recipes["journals"].get(self.journal_id.id) or recipes["all"]
+
+    def _get_datev_cache(self, data, key):
+        return (data or {}).get("cache", {}).get(key)
+
+    def _get_datev_counterpart(self, data=None):
+        counterparts = self._get_datev_cache(data, "counterparts")
+        if counterparts is None:
+            return self.move_id.export_account_counterpart
+        return counterparts[self.move_id.id]
+
+    def _get_datev_analytic_accounts(self, data=None):
+        analytic_accounts = self._get_datev_cache(data, "analytic_accounts")
+        if analytic_accounts is None:
+            return self._fetch_analytic_accounts()
+        return analytic_accounts.get(self.id, self.env["account.analytic.account"])
+
+    def _get_lines_with_partner(self, data=None):
+        partner_lines = self._get_datev_cache(data, "partner_lines")
+        if partner_lines is None:
+            partner_lines = self.move_id.line_ids
+        else:
+            partner_lines = partner_lines[self.move_id.id]
+        return partner_lines.filtered(
+            lambda l: l.partner_id and l.partner_id != self.partner_id
+        )
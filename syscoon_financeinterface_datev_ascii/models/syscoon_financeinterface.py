@@ -3,7 +3,8 @@
 import base64
 import csv
 import logging
-from io import StringIO
+import tempfile
+from io import BytesIO, TextIOWrapper
 
 from dateutil.relativedelta import relativedelta
 from odoo import Command, _, fields, models
@@ -31,8 +32,8 @@ class SyscoonFinanceinterface(models.Model):
     def _journal_required_by_mode(self):
         return super()._journal_required_by_mode() + ["datev_ascii"]
 
-    def _export_datev_ascii(self):
-        """Method that generates the csv export by the given parameters"""
+    def _get_datev_ascii_moves(self):
+        """Returns the moves of the export and raises if there are none"""
         moves = self.env["account.move"].search(
             [
                 ("date", ">=", self.start_date),
@@ -50,29 +51,56 @@ class SyscoonFinanceinterface(models.Model):
                     "range and journals!"
                 )
             )
+        return moves
+
+    def _export_datev_ascii(self):
+        """Method that generates the csv export by the given parameters"""
+        moves = self._get_datev_ascii_moves()
         data = self.generate_export_moves(moves)
         export_header = self.generate_export_header(
             self.header_template(), self.start_date, self.end_date
         )
-        csv_file = self.generate_csv_file(
-            self.export_template(), export_header, data["grouped_lines"]
-        )
-        if not csv_file:
-            raise UserError(
-                _("Something went wrong, because a export file could not generated!")
+        with tempfile.TemporaryFile() as csv_file:
+            self.write_csv_file(
+                csv_file, self.export_template(), export_header, data["grouped_lines"]
             )
-        self.env["ir.attachment"].create(
-            {
-                "name": f"{self.name}.csv",
-                "res_model": "syscoon.financeinterface",
-                "res_id": self.id,
-                "type": "binary",
-                "datas": csv_file,
-            }
-        )
+            if not csv_file.tell():
+                raise UserError(
+                    _(
+                        "Something went wrong, because a export file could not "
+                        "generated!"
+                    )
+                )
+            self._create_export_attachment(f"{self.name}.csv", csv_file)
+        ctx = {"skip_invoice_sync": True, "skip_invoice_line_sync": True}
+        return moves.with_context(**ctx).write({"export_id": self.id})
+
+    def _prepare_chunks_datev_ascii(self):
+        return self._split_export_chunks(self._get_datev_ascii_moves().ids)
+
+    def _export_chunk_datev_ascii(self, chunk):
+        """Converts the moves of the chunk and stores their encoded CSV rows on the
+        chunk. The moves are linked to the export in the same transaction."""
+        moves = self.env["account.move"].browse(chunk.res_ids)
+        data = self.generate_export_moves(moves)
+        buf = BytesIO()
+        self.write_csv_file(buf, {}, False, data["grouped_lines"])
+        chunk._set_output(buf.getvalue())
         ctx = {"skip_invoice_sync": True, "skip_invoice_line_sync": True}
         return moves.with_context(**ctx).write({"export_id": self.id})
 
+    def _finalize_datev_ascii(self, job):
+        """Writes the header and the rows of all chunks into the export file"""
+        export_header = self.generate_export_header(
+            self.header_template(), self.start_date, self.end_date
+        )
+        with tempfile.TemporaryFile() as csv_file:
+            self.write_csv_file(csv_file, self.export_template(), export_header, [])
+            for chunk in job.chunk_ids:
+                csv_file.write(chunk._get_output())
+            self._create_export_attachment(f"{self.name}.csv", csv_file)
+        return True
+
     def _draft_datev_ascii(self):
         """Method that generates the csv export by the given parameters"""
         self.env["ir.attachment"].search(
@@ -91,17 +119,26 @@ class SyscoonFinanceinterface(models.Model):
             "syscoon_financeinterface.syscoon_financeinterface_main_template"
         )
 
-    def generate_export_moves(self, moves):
-        """Generates a list of dicts which have all the exportlines to datev"""
+    def _prepare_export_data(self):
+        """Returns the data dict that is shared by all moves of one export"""
         template = self._export_template()
-        data = {
+        return {
             "interface": self,
             "lines": {},
+            "move_lines": {},
             "group": False,
             "grouped_lines": [],
             "template": template,
-            "template_keys": template._template_vals(line_type="ascii"),
+            "template_keys": template._template_rules(line_type="ascii"),
+            "formatters": self._prepare_column_formatters(self.export_template()),
         }
+
+    def generate_export_moves(self, moves):
+        """Generates a list of dicts which have all the exportlines to datev.
+        All relations needed to build the lines are read for the whole move set
+        upfront and are passed to the lines as in-memory maps in data["cache"]"""
+        data = self._prepare_export_data()
+        data["cache"] = moves._prepare_datev_export_cache()
         for move in moves:
             move.generate_export_lines(data)
         return data
@@ -158,16 +195,27 @@ class SyscoonFinanceinterface(models.Model):
         return header
 
     def generate_csv_file(self, template, header, lines):
-        """Generates the CSV file as in memory with StringIO"""
-        buf = StringIO()
+        """Generates the CSV file in memory and returns it base64 encoded"""
+        buf = BytesIO()
+        self.write_csv_file(buf, template, header, lines)
+        return base64.b64encode(buf.getvalue())
+
+    def write_csv_file(self, csv_file, template, header, lines):
+        """Writes the CSV rows into the binary file object, every row is encoded
+        to ISO-8859-1 as soon as it is written"""
+        buf = TextIOWrapper(
+            csv_file, encoding="iso-8859-1", errors="ignore", newline=""
+        )
         export_csv = csv.writer(buf, delimiter=";", quotechar='"', quoting=csv.QUOTE_ALL)
         if header:
             export_csv.writerow(header.values())
-        export_csv.writerow(template.keys())
+        if template:
+            export_csv.writerow(template.keys())
         for line in lines:
             export_csv.writerow(line.values())
-        output = base64.b64encode(buf.getvalue().encode("iso-8859-1", "ignore"))
-        return output
+        buf.flush()
+        buf.detach()
+        return csv_file
 
     def header_template(self):
         """DATEV ASCII Header V700"""
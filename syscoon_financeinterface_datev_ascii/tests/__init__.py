@@ -0,0 +1,6 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+
+from . import test_datev_ascii_export
+from . import test_datev_ascii_grouping_bench
+from . import test_datev_ascii_export_bench
@@ -0,0 +1,132 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+import base64
+import logging
+
+from odoo import Command, fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests.common import tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("post_install", "-at_install")
+class TestDatevAsciiExport(AccountTestInvoicingCommon):
+    @classmethod
+    def setUpClass(cls):
+        _logger.info("========== START TestDatevAsciiExport ==========")
+        super().setUpClass()
+        cls.env.company.write(
+            {
+                "export_finance_interface_active": True,
+                "export_finance_interface": "datev_ascii",
+                "datev_checks_enabled": False,
+            }
+        )
+        cls.partner_a.write({"debitor_number": "10001", "creditor_number": "70001"})
+        cls.analytic_plan = cls.env["account.analytic.plan"].create(
+            {"name": "DATEV KOST1", "datev_cost_center": "add_to_kost1"}
+        )
+        cls.analytic_account = cls.env["account.analytic.account"].create(
+            {"name": "Cost Center", "code": "100", "plan_id": cls.analytic_plan.id}
+        )
+        cls.invoice = cls.init_invoice(
+            "out_invoice",
+            partner=cls.partner_a,
+            invoice_date=fields.Date.from_string("2024-01-10"),
+            amounts=[100.0, 250.0],
+            taxes=cls.company_data["default_tax_sale"],
+        )
+        cls.invoice.invoice_line_ids[:1].analytic_distribution = {
+            str(cls.analytic_account.id): 100
+        }
+        cls.invoice.action_post()
+        cls.bill = cls.init_invoice(
+            "in_invoice",
+            partner=cls.partner_a,
+            invoice_date=fields.Date.from_string("2024-01-15"),
+            amounts=[80.0],
+            taxes=cls.company_data["default_tax_purchase"],
+            post=True,
+        )
+        cls.moves = cls.invoice | cls.bill
+        cls.interface = cls.env["syscoon.financeinterface"].create(
+            {
+                "mode": "datev_ascii",
+                "start_date": fields.Date.from_string("2024-01-01"),
+                "end_date": fields.Date.from_string("2024-01-31"),
+                "journal_ids": [Command.set(cls.moves.journal_id.ids)],
+            }
+        )
+        _logger.info("========== DONE TestDatevAsciiExport ==========")
+
+    def _generate_csv_line_by_line(self, moves):
+        """Builds the export without the prefetched data, line by line"""
+        data = self.interface._prepare_export_data()
+        for move in moves:
+            move.generate_export_lines(data)
+        return self.interface.generate_csv_file(
+            self.interface.export_template(), {}, data["grouped_lines"]
+        )
+
+    def test_batch_export_matches_line_by_line_export(self):
+        _logger.info(
+            "========== START test_batch_export_matches_line_by_line_export =========="
+        )
+        expected = self._generate_csv_line_by_line(self.moves)
+        self.env.invalidate_all()
+        data = self.interface.generate_export_moves(self.moves)
+        result = self.interface.generate_csv_file(
+            self.interface.export_template(), {}, data["grouped_lines"]
+        )
+        self.assertTrue(data["grouped_lines"])
+        self.assertEqual(result, expected)
+        _logger.info(
+            "========== DONE test_batch_export_matches_line_by_line_export =========="
+        )
+
+    def test_background_export(self):
+        _logger.info("========== START test_background_export ==========")
+        self.env.company.export_chunk_size = 1
+        expected = self.interface.generate_csv_file(
+            self.interface.export_template(),
+            {},
+            self.interface.generate_export_moves(self.moves)["grouped_lines"],
+        )
+        self.interface.export_async = True
+        self.interface.action_export()
+        self.assertEqual(self.interface.state, "queued")
+        job = self.interface.job_ids
+        self.assertEqual(len(job.chunk_ids), 2)
+        self.assertEqual(job.progress, 0.0)
+        self.assertTrue(job._process())
+        self.assertEqual(job.state, "done")
+        self.assertEqual(job.progress, 100.0)
+        self.assertEqual(self.interface.state, "export")
+        self.assertEqual(self.interface.account_moves_ids, self.moves)
+        attachment = self.env["ir.attachment"].search(
+            [
+                ("res_model", "=", self.interface._name),
+                ("res_id", "=", self.interface.id),
+            ]
+        )
+        # the first row is the header with the creation time
+        rows = attachment.raw.split(b"\r\n", 1)[1]
+        self.assertEqual(base64.b64encode(rows), expected)
+        _logger.info("========== DONE test_background_export ==========")
+
+    def test_origin_moves(self):
+        _logger.info("========== START test_origin_moves ==========")
+        payment = (
+            self.env["account.payment.register"]
+            .with_context(active_model="account.move", active_ids=self.invoice.ids)
+            .create({"payment_date": fields.Date.from_string("2024-01-20")})
+            ._create_payments()
+        )
+        moves = self.moves | payment.move_id
+        origins = moves._prepare_datev_origin_moves()
+        for line in moves.line_ids:
+            self.assertEqual(origins[line.id], line.move_id._datev_move(line))
+        for line in payment.move_id.line_ids:
+            self.assertEqual(origins[line.id], self.invoice)
+        _logger.info("========== DONE test_origin_moves ==========")
@@ -0,0 +1,31 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from odoo import Command
+from odoo.addons.syscoon_financeinterface.tests.common import DatevBenchmarkCommon
+from odoo.tests.common import tagged
+
+
+@tagged("post_install", "-at_install", "-standard", "datev_bench")
+class TestDatevAsciiExportBenchmark(DatevBenchmarkCommon):
+    """Times the DATEV ASCII export. Run with --test-tags datev_bench"""
+
+    BENCH_MODULE = "syscoon_financeinterface_datev_ascii"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env.company.export_finance_interface = "datev_ascii"
+        cls.invoices, cls.payments = cls._generate_bench_data()
+
+    def test_export_datev_ascii(self):
+        moves = self.invoices | self.payments.move_id
+        interface = self.env["syscoon.financeinterface"].create(
+            {
+                "mode": "datev_ascii",
+                "start_date": self.bench_date,
+                "end_date": self.bench_date.replace(day=31),
+                "journal_ids": [Command.set(moves.journal_id.ids)],
+            }
+        )
+        self._measure_export("datev_ascii", interface._export_datev_ascii, len(moves))
+        self.assertEqual(moves.export_id, interface)
@@ -0,0 +1,73 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+import logging
+import time
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests.common import tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("post_install", "-at_install", "-standard", "datev_bench")
+class TestDatevAsciiGroupingBenchmark(AccountTestInvoicingCommon):
+    """Times the grouping of the converted move lines for a growing number of
+    moves. Run with --test-tags datev_bench"""
+
+    SCALES = (1000, 10000, 100000)
+    LINES_PER_MOVE = 2
+
+    @classmethod
+    def setUpClass(cls):
+        _logger.info("========== START TestDatevAsciiGroupingBenchmark ==========")
+        super().setUpClass()
+        cls.journal = cls.company_data["default_journal_misc"]
+        cls.journal.datev_ascii_group_moves = True
+        _logger.info("========== DONE TestDatevAsciiGroupingBenchmark ==========")
+
+    def _prepare_grouping_data(self, count):
+        """Returns synthetic moves and the export data of their converted lines"""
+        data = self.env["syscoon.financeinterface"]._prepare_export_data()
+        data["template_keys"] = {}
+        moves = [
+            self.env["account.move"].new({"journal_id": self.journal.id})
+            for _index in range(count)
+        ]
+        line_id = 0
+        for move in moves:
+            line_ids = data["move_lines"].setdefault(move.id, [])
+            for _index in range(self.LINES_PER_MOVE):
+                line_id += 1
+                export = {key: "" for key in move._group_match_fields()}
+                export.update(
+                    {
+                        "Konto": "8400",
+                        "Gegenkonto (ohne BU-Schlüssel)": "10001",
+                        "Umsatz (ohne Soll/Haben-Kz)": 100.0,
+                        "Basis-Umsatz": "",
+                    }
+                )
+                data["lines"][line_id] = {"move": move, "export": export}
+                line_ids.append(line_id)
+        return moves, data
+
+    def test_grouping_scales_linearly(self):
+        _logger.info("========== START test_grouping_scales_linearly ==========")
+        timings = []
+        for count in self.SCALES:
+            moves, data = self._prepare_grouping_data(count)
+            start = time.perf_counter()
+            for move in moves:
+                move.group_converted_move_lines(data)
+            duration = time.perf_counter() - start
+            self.assertEqual(len(data["grouped_lines"]), count)
+            timings.append(duration / count)
+            _logger.info(
+                "DATEV ASCII grouping: %s moves in %.3fs (%.1f µs per move)",
+                count,
+                duration,
+                duration / count * 1e6,
+            )
+        # The cost per move must not grow with the size of the export
+        self.assertLess(timings[-1], timings[0] * 5)
+        _logger.info("========== DONE test_grouping_scales_linearly ==========")
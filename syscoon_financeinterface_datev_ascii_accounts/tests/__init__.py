@@ -0,0 +1,4 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+
+from . import test_datev_ascii_accounts_export_bench
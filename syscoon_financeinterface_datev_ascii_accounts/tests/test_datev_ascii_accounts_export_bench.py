@@ -0,0 +1,35 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from odoo.addons.syscoon_financeinterface.tests.common import DatevBenchmarkCommon
+from odoo.tests.common import tagged
+
+
+@tagged("post_install", "-at_install", "-standard", "datev_bench")
+class TestDatevAsciiAccountsExportBenchmark(DatevBenchmarkCommon):
+    """Times the DATEV ASCII accounts export. Run with --test-tags datev_bench"""
+
+    BENCH_MODULE = "syscoon_financeinterface_datev_ascii_accounts"
+    # the accounts export is driven by the partners, one per invoice
+    PARTNERS_PER_INVOICE = 1
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.invoices, cls.payments = cls._generate_bench_data()
+
+    def test_export_datev_ascii_accounts(self):
+        interface = self.env["syscoon.financeinterface"].create(
+            {
+                "mode": "datev_ascii_accounts",
+                "datev_ascii_accounts_kind": "rewe",
+                "datev_ascii_accounts_account_kind": "all",
+                "datev_ascii_accounts_account": "both",
+                "start_date": self.bench_date,
+            }
+        )
+        partners = interface._get_export_partners()
+        self._measure_export(
+            "datev_ascii_accounts",
+            interface._export_datev_ascii_accounts,
+            len(partners),
+        )
@@ -1,6 +1,13 @@
 # © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
 # License OPL-1, See LICENSE file for full copyright and licensing details.
+import logging
+
 from odoo import fields, models
+from odoo.tools.sql import create_index, index_exists
+
+_logger = logging.getLogger(__name__)
+
+GUID_INDEX = "account_move_syscoon_datev_import_guid_company_idx"
 
 
 class AccountMove(models.Model):
@@ -9,7 +16,43 @@ class AccountMove(models.Model):
     syscoon_datev_import_id = fields.Many2one(
         "syscoon.datev.import", "DATEV Import", readonly=True
     )
-    syscoon_datev_import_guid = fields.Char("DATEV Move GUID")
+    syscoon_datev_import_guid = fields.Char("DATEV Move GUID", copy=False)
+
+    def init(self):
+        """Indexes the GUIDs by company, the index is unique unless there are
+        already duplicated GUIDs"""
+        super().init()
+        if index_exists(self.env.cr, GUID_INDEX):
+            return
+        where = (
+            "syscoon_datev_import_guid IS NOT NULL AND syscoon_datev_import_guid != ''"
+        )
+        self.env.cr.execute(
+            f"""SELECT 1
+                  FROM account_move
+                 WHERE {where}
+              GROUP BY company_id, syscoon_datev_import_guid
+                HAVING COUNT(*) > 1
+                 LIMIT 1"""
+        )
+        if self.env.cr.fetchone():
+            _logger.warning(
+                "DATEV Import: moves with duplicated GUIDs exist, "
+                "the GUID index is not unique"
+            )
+            create_index(
+                self.env.cr,
+                GUID_INDEX,
+                self._table,
+                ["company_id", "syscoon_datev_import_guid"],
+                where=where,
+            )
+            return
+        self.env.cr.execute(
+            f"""CREATE UNIQUE INDEX {GUID_INDEX}
+                    ON account_move (company_id, syscoon_datev_import_guid)
+                 WHERE {where}"""
+        )
 
     def _prepare_datev_reconcile_lines(self):
         reconcile_lines = self.env["account.move.line"]
@@ -3,17 +3,26 @@
 import base64
 import csv
 import logging
+import threading
 import time
+from collections import namedtuple
 from datetime import datetime
-from functools import lru_cache
-from io import StringIO
+from io import BytesIO, StringIO, TextIOWrapper
 
 from odoo import _, fields, models
 from odoo.exceptions import UserError
+from odoo.tools import split_every
 from odoo.tools.safe_eval import safe_eval
+from psycopg2 import IntegrityError
+
+from .account_move import GUID_INDEX
+from .import_lookup import DatevImportLookup
 
 _logger = logging.getLogger(__name__)
 
+# number of rows that are read, checked and converted at once
+IMPORT_BATCH_SIZE = 1000
+
 ACCOUNT_TYPES = [
     "asset_receivable",
     "asset_cash",
@@ -38,6 +47,25 @@ COST_ACCOUNT_TYPES = [
     "expense_direct_cost",
 ]
 
+ImportLog = namedtuple("ImportLog", ["line", "name", "state"])
+
+
+class ImportValue:
+    """Value of a column in an imported row, all other keys are read from the
+    column struct of get_import_struct that is shared by all rows"""
+
+    __slots__ = ("column", "import_value")
+
+    def __init__(self, column, import_value):
+        self.column = column
+        self.import_value = import_value
+
+    def __getitem__(self, key):
+        if key == "import_value":
+            return self.import_value
+        return self.column[key]
+
+
 NO_TAX_ACCOUNT_TYPES = [
     "asset_receivable",
     "asset_cash",
@@ -93,6 +121,12 @@ class ImportDatev(models.Model):
         default="draft",
         tracking=True,
     )
+    imported_rows = fields.Integer(
+        readonly=True,
+        copy=False,
+        help="Number of rows whose moves are created and committed, an interrupted "
+        "import continues after this row",
+    )
 
     def start_import(self):
         """Initial function for manage the import of DATEV-moves"""
@@ -101,31 +135,20 @@ class ImportDatev(models.Model):
         self.env["syscoon.datev.import.log"].create(
             {"parent_id": self.id, "name": _("Import started"), "state": "info"}
         )
-        move_values = {}
         log_error = False
-        file = self.get_attachment()
-        if self.get_import_config()["remove_datev_header"]:
-            file = self.remove_datev_header(file)
-        import_list = self.convert_lines(file)
+        lookup = self._prepare_import_lookup()
         log_vals = []
-        for log in self.check_can_created(import_list):
-            if log["state"] == "error":
-                log_error = True
-            log_vals.append(
-                {
-                    "parent_id": log["parent_id"],
-                    "line": log["line"],
-                    "name": log["name"],
-                    "state": log["state"],
-                }
-            )
+        for start, rows in self._read_import_batches():
+            for log in self.check_can_created(rows, lookup, start):
+                if log.state == "error":
+                    log_error = True
+                log_vals.append({"parent_id": self.id, **log._asdict()})
         if log_vals:
             self.env["syscoon.datev.import.log"].create(log_vals)
         if log_error:
             self.write({"state": "error"})
-        if not log_error:
-            move_values = self.create_values(import_list)
-        self._process_move_creation(move_values)
+        if not log_error and self._create_moves_in_chunks(lookup):
+            self._finish_move_creation()
         self.env["syscoon.datev.import.log"].create(
             {
                 "parent_id": self.id,
@@ -134,10 +157,88 @@ class ImportDatev(models.Model):
             }
         )
 
-    def _process_move_creation(self, move_values):
-        if not move_values:
-            return
-        self.create_moves(move_values)
+    def _create_moves_in_chunks(self, lookup):
+        """Builds and creates the moves in chunks of rows of the template chunk
+        size. Every chunk is committed with its last row as checkpoint, so an
+        interrupted import continues after the last committed chunk and the GUIDs
+        of the created moves guard against duplicates. Returns if the import has
+        moves"""
+        if self.imported_rows:
+            self.env["syscoon.datev.import.log"].create(
+                {
+                    "parent_id": self.id,
+                    "name": _("Import continued after row %s", self.imported_rows),
+                    "state": "info",
+                }
+            )
+        chunk_size = self.template_id.chunk_size or IMPORT_BATCH_SIZE
+        for start, rows in self._read_import_batches(chunk_size):
+            last = start + len(rows) - 1
+            if last <= self.imported_rows:
+                continue
+            rows = rows[max(self.imported_rows - start + 1, 0) :]
+            move_values = self.create_values(rows, lookup)
+            if move_values and not self._create_chunk_moves(move_values):
+                # the checkpoint stays before the chunk
+                self.write({"state": "error"})
+                self._commit()
+                return False
+            self.imported_rows = last
+            self._commit()
+        return bool(self.account_move_ids)
+
+    def _create_chunk_moves(self, move_values):
+        """Creates the moves of a chunk. If a GUID of the chunk was imported
+        meanwhile by another import or elsewhere, the chunk is rolled back, the
+        GUIDs are logged as errors and False is returned"""
+        try:
+            with self.env.cr.savepoint():
+                self.create_moves(move_values)
+        except IntegrityError as e:
+            if e.diag.constraint_name != GUID_INDEX:
+                raise
+            self._log_existing_guids(move_values)
+            return False
+        return True
+
+    def _log_existing_guids(self, move_values):
+        guids = [
+            vals["syscoon_datev_import_guid"]
+            for vals in move_values
+            if vals.get("syscoon_datev_import_guid")
+        ]
+        existing_guids = set(
+            self.env["account.move"]
+            .sudo()
+            .search_fetch(
+                [
+                    ("company_id", "=", self.company_id.id),
+                    ("syscoon_datev_import_guid", "in", guids),
+                ],
+                ["syscoon_datev_import_guid"],
+            )
+            .mapped("syscoon_datev_import_guid")
+        )
+        self.env["syscoon.datev.import.log"].create(
+            [
+                {
+                    "parent_id": self.id,
+                    "name": _(
+                        "Move with GUID %s already exists, the import stopped "
+                        "before its chunk.",
+                        guid,
+                    ),
+                    "state": "error",
+                }
+                for guid in [g for g in guids if g in existing_guids] or guids
+            ]
+        )
+
+    def _commit(self):
+        if not getattr(threading.current_thread(), "testing", False):
+            self.env.cr.commit()  # pylint: disable=invalid-commit
+
+    def _finish_move_creation(self):
         self.write({"state": "imported"})
         if self.template_id.auto_reconcile or self.template_id.post_moves:
             self.confirm_moves()
@@ -170,7 +271,7 @@ class ImportDatev(models.Model):
             self.account_move_ids.unlink()
         if self.log_line:
             self.log_line.unlink()
-        self.write({"state": "draft"})
+        self.write({"state": "draft", "imported_rows": 0})
 
     def confirm_moves(self):
         if self.state == "imported":
@@ -210,6 +311,10 @@ class ImportDatev(models.Model):
                 )
 
     def get_attachment(self):
+        file = base64.decodebytes(self._get_import_attachment().datas)
+        return file.decode(self.get_import_config()["encoding"])
+
+    def _get_import_attachment(self):
         attachment = self.env["ir.attachment"].search(
             [
                 ("res_model", "=", "syscoon.datev.import"),
@@ -219,9 +324,7 @@ class ImportDatev(models.Model):
         if not attachment:
             raise UserError(_("No Import File uploaded, please upload one!"))
         if len(attachment) == 1:
-            file = base64.decodebytes(attachment.datas)
-            file = file.decode(self.get_import_config()["encoding"])
-            return file
+            return attachment
         raise UserError(
             _(
                 "There is more than one file attached to this record. "
@@ -276,41 +379,68 @@ class ImportDatev(models.Model):
         file = file[file.index("\n") + 1 :]
         return file
 
+    def _open_import_file(self):
+        """Returns the uploaded file as text stream that is read from the filestore
+        and decoded while the rows are read"""
+        attachment = self._get_import_attachment()
+        config = self.get_import_config()
+        if attachment.store_fname:
+            path = attachment._full_path(attachment.store_fname)
+            stream = open(path, "rb")
+        else:
+            stream = BytesIO(attachment.raw)
+        file = TextIOWrapper(stream, encoding=config["encoding"], newline="")
+        if config["remove_datev_header"]:
+            file.readline()
+        return file
+
+    def _read_import_batches(self, batch_size=IMPORT_BATCH_SIZE):
+        """Yields the number of the first row and the rows of every batch of
+        batch_size rows of the uploaded file"""
+        with self._open_import_file() as file:
+            start = 1
+            for rows in split_every(batch_size, self.convert_lines(file)):
+                yield start, rows
+                start += len(rows)
+
     def convert_lines(self, file):
+        """Yields the rows of the CSV file as dict of ImportValue by column name,
+        file is the text of the file or a text stream"""
         config = self.get_import_config()
+        if isinstance(file, str):
+            file = StringIO(file)
         reader = csv.DictReader(
-            StringIO(file), delimiter=config["delimiter"], quotechar=config["quotechar"]
+            file, delimiter=config["delimiter"], quotechar=config["quotechar"]
         )
-        pre_import_list = []
-        for row in reader:
-            pre_import_list.append(dict(row))
-        import_list = []
         struct = self.get_import_struct()
-        for row in pre_import_list:
-            new_row = {}
-            for key, value in row.items():
-                if key not in struct:
-                    continue
-                struct_values = struct[key].copy()
-                struct_values["import_value"] = value
-                new_row[key] = struct_values
-            import_list.append(new_row)
-        return import_list
-
-    def check_can_created(self, vals_list):
+        for row in reader:
+            yield {
+                key: ImportValue(struct[key], value)
+                for key, value in row.items()
+                if key in struct
+            }
+
+    def check_can_created(self, vals_list, lookup=None, start=1):
+        """Validates all rows in one pass and returns the logs of the failed
+        checks as ImportLog, start is the number of the first row"""
+        lookup = lookup or self._prepare_import_lookup()
+        required_types = self._get_required_types()
+        type_labels = dict(
+            self.env["syscoon.datev.import.assignment"]
+            ._fields["type"]
+            ._description_selection(self.env)
+        )
         logs = []
-        count = 1
-        for values in vals_list:
-            logs += self.check_required_fields(values, count)
-            count += 1
-        count = 1
-        for values in vals_list:
-            logs += self.check_values(values, count)
-            count += 1
+        lookup.load_guids(vals_list)
+        for count, values in enumerate(vals_list, start):
+            logs += self.check_required_fields(
+                values, count, required_types, type_labels
+            )
+            logs += self.check_values(values, count, lookup)
         return logs
 
-    def check_required_fields(self, values, count):
-        logs = []
+    def _get_required_types(self):
+        """Returns the assignment types every row must have a value for"""
         required_types = [
             "amount",
             "move_sign",
@@ -318,66 +448,65 @@ class ImportDatev(models.Model):
             "counteraccount",
             "move_date",
         ]
-        template_required = self.template_id.import_config_row_ids.search(
-            [("required", "=", True)]
-        )
+        template_required = self.template_id.import_config_row_ids.filtered("required")
         for template in template_required:
             if template.assignment_type.type not in required_types:
                 required_types.append(template.assignment_type.type)
-        for k, v in values.items():
-            _logger.info(k, v)
-            if (v["type"].type in required_types and v["import_value"]) or (
-                v["type"].type == "tax_key"
-                and v["type"].type in required_types
-                and not v["import_value"]
-            ):
-                required_types.remove(v["type"].type)
-        for required_type in required_types:
-            field = dict(
+        return required_types
+
+    def check_required_fields(
+        self, values, count, required_types=None, type_labels=None
+    ):
+        if required_types is None:
+            required_types = self._get_required_types()
+        if type_labels is None:
+            type_labels = dict(
                 self.env["syscoon.datev.import.assignment"]
                 ._fields["type"]
                 ._description_selection(self.env)
-            )[required_type]
-            logs.append(
-                {
-                    "parent_id": self.id,
-                    "line": count,
-                    "name": _("Missing Required Field %s.", field),
-                    "state": "error",
-                }
             )
-        return logs
+        # a tax key column satisfies the required tax key also without a value
+        found_types = {
+            v["type"].type
+            for v in values.values()
+            if v["import_value"] or v["type"].type == "tax_key"
+        }
+        return [
+            ImportLog(
+                count,
+                _("Missing Required Field %s.", type_labels[required_type]),
+                "error",
+            )
+            for required_type in required_types
+            if required_type not in found_types
+        ]
 
-    def check_values(self, values, count):  # noqa: C901
+    def check_values(self, values, count, lookup=None):  # noqa: C901
+        lookup = lookup or self._prepare_import_lookup()
         logs = []
         for k, v in values.items():
+            value_type = v["type"].type
             if v["field_type"] == "decimal":
                 try:
                     self.convert_to_float(v["import_value"])
                 except Exception:
                     logs.append(
-                        {
-                            "parent_id": self.id,
-                            "line": count,
-                            "name": _("%s cant be converted.", k),
-                            "state": "error",
-                        }
+                        ImportLog(count, _("%s cant be converted.", k), "error")
                     )
-            if v["type"].type == "move_sign":
+            if value_type == "move_sign":
                 try:
                     self.check_move_sign(v["import_value"])
                 except Exception:
                     logs.append(
-                        {
-                            "parent_id": self.id,
-                            "line": count,
-                            "name": _("%s does not exist. It must be S or H.", k),
-                            "state": "error",
-                        }
+                        ImportLog(
+                            count,
+                            _("%s does not exist. It must be S or H.", k),
+                            "error",
+                        )
                     )
             if v["type"].object and v["import_value"]:
                 try:
-                    self.get_object(
+                    lookup.get_object(
                         v["type"].object,
                         v["type"].field,
                         v["import_value"],
@@ -385,100 +514,57 @@ class ImportDatev(models.Model):
                     )
                 except Exception:
                     logs.append(
-                        {
-                            "parent_id": self.id,
-                            "line": count,
-                            "name": _("%s does not exist. Please Check.", k),
-                            "state": "error",
-                        }
-                    )
-            if v["type"].type == "account":
-                partner = self.env["res.partner"]
-                partner_check = False
-                account_id = self.get_object(
-                    v["type"].object, v["type"].field, v["import_value"], v["padding"]
-                )
-                if not account_id:
-                    partner_debit_id = partner.search(
-                        [("debitor_number", "=", v["import_value"])]
-                    )
-                    partner_credit_id = partner.search(
-                        [("creditor_number", "=", v["import_value"])]
-                    )
-                    if partner_debit_id or partner_credit_id:
-                        partner_check = True
-                    if not partner_check:
-                        logs.append(
-                            {
-                                "parent_id": self.id,
-                                "line": count,
-                                "name": _(
-                                    "%s does not exist. Please Check.",
-                                    v["import_value"],
-                                ),
-                                "state": "error",
-                            }
+                        ImportLog(
+                            count, _("%s does not exist. Please Check.", k), "error"
                         )
-            if v["type"].type == "counteraccount":
-                partner = self.env["res.partner"]
-                partner_check = False
-                account_id = self.get_object(
+                    )
+            if value_type in ("account", "counteraccount"):
+                account_id = lookup.get_object(
                     v["type"].object, v["type"].field, v["import_value"], v["padding"]
                 )
                 if not account_id:
-                    partner_debit_id = partner.search(
-                        [("debitor_number", "=", v["import_value"])]
-                    )
-                    partner_credit_id = partner.search(
-                        [("creditor_number", "=", v["import_value"])]
+                    partner_debit_id = lookup.get_partners("debitor", v["import_value"])
+                    partner_credit_id = lookup.get_partners(
+                        "creditor", v["import_value"]
                     )
-                    if partner_debit_id or partner_credit_id:
-                        partner_check = True
-                    if not partner_check:
+                    if not partner_debit_id and not partner_credit_id:
                         logs.append(
-                            {
-                                "parent_id": self.id,
-                                "line": count,
-                                "name": _(
+                            ImportLog(
+                                count,
+                                _(
                                     "%s does not exist. Please Check.",
                                     v["import_value"],
                                 ),
-                                "state": "error",
-                            }
+                                "error",
+                            )
                         )
-            if v["type"].type == "move_date":
+            if value_type == "move_date":
                 try:
                     datetime.strptime(v["import_value"], v["date_format"])
                 except Exception:
                     logs.append(
-                        {
-                            "parent_id": self.id,
-                            "line": count,
-                            "name": _(
+                        ImportLog(
+                            count,
+                            _(
                                 "%(key)s does not fit to %(value)s. Please Check.",
                                 key=k,
                                 value=v["date_format"],
                             ),
-                            "state": "error",
-                        }
+                            "error",
+                        )
                     )
-            if v["type"].type == "guid":
-                created_guid = self.env["account.move"].search(
-                    [("syscoon_datev_import_guid", "=", v["import_value"])]
-                )
-                if created_guid:
-                    logs.append(
-                        {
-                            "parent_id": self.id,
-                            "line": count,
-                            "name": _(
-                                "%(key)s with GUID %(value)s already exist and can not be imported",
-                                key=k,
-                                value=v["import_value"],
-                            ),
-                            "state": "warning",
-                        }
+            if value_type == "guid" and v["import_value"] in lookup.guids:
+                logs.append(
+                    ImportLog(
+                        count,
+                        _(
+                            "%(key)s with GUID %(value)s already exist and can not be imported",
+                            key=k,
+                            value=v["import_value"],
+                        ),
+                        "warning",
                     )
+                )
         return logs
 
     def convert_to_float(self, value):
@@ -532,6 +618,11 @@ class ImportDatev(models.Model):
             return_object = self.env[model_obj].search(domain + [(field, "=", value)])
         return return_object
 
+    def _prepare_import_lookup(self):
+        """Returns the in-memory lookup of accounts, taxes, analytic accounts and
+        partners for the rows of this import"""
+        return DatevImportLookup(self)
+
     def _prepare_default_move_values(self):
         move = {
             "ref": False,
@@ -582,10 +673,10 @@ class ImportDatev(models.Model):
             "discount_line": discount_line,
         }
 
-    def _get_analytic_account(self, account_id, cost_center, values):
+    def _get_analytic_account(self, account_id, cost_center, values, lookup=None):
         if account_id.account_type not in COST_ACCOUNT_TYPES:
             return self.env["account.analytic.account"]
-        return self.get_object(
+        return (lookup or self).get_object(
             values["type"].object,
             values["type"].field,
             values["import_value"],
@@ -606,13 +697,14 @@ class ImportDatev(models.Model):
     def _is_cost_account(self, account_id):
         return account_id and account_id.account_type in COST_ACCOUNT_TYPES
 
-    def create_values(self, vals_list):  # noqa: C901
-        @lru_cache
+    def create_values(self, vals_list, lookup=None):  # noqa: C901
         def _partner(field_key, number):
-            return partner.search([(f"{field_key}_number", "=", number)], limit=1)
+            return lookup.get_partners(field_key, number)[:1]
 
+        lookup = lookup or self._prepare_import_lookup()
+        lookup.load_guids(vals_list)
         moves = []
-        partner = self.env["res.partner"]
+        log_vals = []
         move_obj = self.env["account.move"]
         company_currency = self.company_id.currency_id.name
 
@@ -640,7 +732,7 @@ class ImportDatev(models.Model):
                 elif v["type"].type == "move_ref":
                     debit_line["name"] = v["import_value"]
                     credit_line["name"] = v["import_value"]
-                elif v["type"].type == "guid":
+                elif v["type"].type == "guid" and v["import_value"]:
                     move["syscoon_datev_import_guid"] = v["import_value"]
 
             amount_key = "base_amount" if has_currency else "amount"
@@ -655,7 +747,7 @@ class ImportDatev(models.Model):
 
             for _k, v in values.items():
                 if v["type"].type == "account":
-                    debit_line["account_id"] = self.get_object(
+                    debit_line["account_id"] = lookup.get_object(
                         v["type"].object,
                         v["type"].field,
                         v["import_value"],
@@ -680,7 +772,7 @@ class ImportDatev(models.Model):
                             debit_line["partner_id"] = partner_credit_id.id
                             credit_line["partner_id"] = partner_credit_id.id
                 if v["type"].type == "counteraccount":
-                    credit_line["account_id"] = self.get_object(
+                    credit_line["account_id"] = lookup.get_object(
                         v["type"].object,
                         v["type"].field,
                         v["import_value"],
@@ -726,7 +818,7 @@ class ImportDatev(models.Model):
             for _k, v in values.items():
                 if v["type"].type == "tax_key" and v["import_value"]:
                     if v["import_value"] != "40":
-                        tax_id = self.get_object(
+                        tax_id = lookup.get_object(
                             v["type"].object,
                             v["type"].field,
                             v["import_value"],
@@ -766,11 +858,11 @@ class ImportDatev(models.Model):
                         v["type"].type
                     )
                     if debit_analytic := self._get_analytic_account(
-                        debit_line["account_id"], cost_key, v
+                        debit_line["account_id"], cost_key, v, lookup
                     ):
                         debit_line["analytic_distribution"][str(debit_analytic.id)] = 100
                     if credit_analytic := self._get_analytic_account(
-                        credit_line["account_id"], cost_key, v
+                        credit_line["account_id"], cost_key, v, lookup
                     ):
                         credit_line["analytic_distribution"][
                             str(credit_analytic.id)
@@ -888,21 +980,6 @@ class ImportDatev(models.Model):
                         "tax_repartition_line_id": tax["tax_repartition_line_id"],
                     }
 
-                    partner_debit_id = partner.search(
-                        [
-                            ("debitor_number", "!=", False),
-                            ("debitor_number", "=", v["import_value"]),
-                        ],
-                        limit=1,
-                    )
-                    partner_credit_id = partner.search(
-                        [
-                            ("creditor_number", "!=", False),
-                            ("creditor_number", "=", v["import_value"]),
-                        ],
-                        limit=1,
-                    )
-
                     if debit_line["tax_ids"]:
                         if debit_line["debit"]:
                             if tax["amount"] < 0.0:
@@ -948,26 +1025,21 @@ class ImportDatev(models.Model):
                     and self.template_id.ignore_incomplete_moves
                 ):
                     remove = True
-                    self.env["syscoon.datev.import.log"].create(
+                    log_vals.append(
                         {
                             "parent_id": self.id,
                             "name": _("Move %s not imported", move["ref"]),
                             "state": "warning",
                         }
                     )
-            existing_guid = False
-            if move.get("syscoon_datev_import_guid"):
-                existing_guid = self.env["account.move"].search(
-                    [
-                        (
-                            "syscoon_datev_import_guid",
-                            "=",
-                            move["syscoon_datev_import_guid"],
-                        )
-                    ]
-                )
-            if not remove and not existing_guid:
+            # a GUID of the file is imported once, also when it is repeated
+            guid = move.get("syscoon_datev_import_guid")
+            if not remove and guid not in lookup.guids:
                 moves.append(move)
+                if guid:
+                    lookup.guids.add(guid)
+        if log_vals:
+            self.env["syscoon.datev.import.log"].create(log_vals)
         return moves
 
     def create_moves(self, moves):
@@ -975,14 +1047,16 @@ class ImportDatev(models.Model):
             default_journal_id=self.journal_id.id
         )
         move_ids = move_obj.sudo().create(moves)
-        for mv in move_ids:
-            self.env["syscoon.datev.import.log"].create(
+        self.env["syscoon.datev.import.log"].create(
+            [
                 {
                     "parent_id": self.id,
                     "name": _("Move %s imported", mv["ref"]),
                     "state": "info",
                 }
-            )
+                for mv in move_ids
+            ]
+        )
         return move_ids
 
 
@@ -29,6 +29,10 @@ class SyscoonImportDatevConfig(models.Model):
     payment_difference_handling = fields.Selection(
         [("open", "Keep open"), ("reconcile", "Mark invoice as fully paid")]
     )
+    chunk_size = fields.Integer(
+        default=1000,
+        help="Number of rows whose moves are created and committed at once",
+    )
 
 
 class SyscoonImportDatevConfigRows(models.Model):
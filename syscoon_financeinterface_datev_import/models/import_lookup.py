@@ -0,0 +1,101 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from collections import defaultdict
+
+from odoo.tools.safe_eval import safe_eval
+
+
+class DatevImportLookup:
+    """In-memory index of the records an import looks up by the values of its
+    rows. Every index is loaded with one search on its first use and kept for the
+    whole import, so checking and building the moves need no further queries"""
+
+    def __init__(self, datev_import):
+        self.env = datev_import.env
+        self.company = datev_import.company_id
+        self._indexes = {}
+        self._partners = {}
+        self._checked_guids = set()
+        self.guids = set()
+
+    def _parse_domain(self, domain):
+        if isinstance(domain, list):
+            return domain
+        try:
+            return safe_eval(domain) if isinstance(domain, str) else []
+        except Exception:
+            return []
+
+    def _get_domain(self, model_obj, domain):
+        domain = list(self._parse_domain(domain))
+        if model_obj == "account.tax":
+            domain.append(("company_id", "=", self.company.id))
+        elif model_obj == "account.account":
+            domain.append(("company_ids", "in", [self.company.id]))
+        return domain
+
+    def _get_index(self, model_obj, field, domain):
+        key = (model_obj, field, repr(domain))
+        if key not in self._indexes:
+            records = self.env[model_obj].search(self._get_domain(model_obj, domain))
+            ids_by_value = defaultdict(list)
+            for record in records:
+                if (value := record[field]) is not False:
+                    ids_by_value[str(value)].append(record.id)
+            self._indexes[key] = {
+                value: self.env[model_obj].browse(ids)
+                for value, ids in ids_by_value.items()
+            }
+        return self._indexes[key]
+
+    def get_object(self, model_obj, field, value, padding, domain=None):
+        """Returns the records like ImportDatev.get_object without a query"""
+        index = self._get_index(model_obj, field, domain)
+        if model_obj == "account.tax":
+            return index.get(value, self.env[model_obj])[:1]
+        if padding:
+            value = value.zfill(padding)
+        return index.get(value, self.env[model_obj])
+
+    def get_partners(self, field_key, number):
+        """Returns the partners with the debitor or creditor number, field_key is
+        debitor or creditor"""
+        if field_key not in self._partners:
+            field = f"{field_key}_number"
+            partners = self.env["res.partner"].search_fetch(
+                [(field, "!=", False)], [field]
+            )
+            ids_by_number = defaultdict(list)
+            for partner in partners:
+                ids_by_number[partner[field]].append(partner.id)
+            self._partners[field_key] = {
+                key: self.env["res.partner"].browse(ids)
+                for key, ids in ids_by_number.items()
+            }
+        return self._partners[field_key].get(number, self.env["res.partner"])
+
+    def load_guids(self, rows):
+        """Reads which GUIDs of the rows already exist on moves of the company
+        with one query, the existing GUIDs are added to guids"""
+        guids = {
+            v["import_value"]
+            for row in rows
+            for v in row.values()
+            if v["type"].type == "guid" and v["import_value"]
+        }
+        guids -= self._checked_guids
+        if not guids:
+            return
+        moves = (
+            self.env["account.move"]
+            .sudo()
+            .search_fetch(
+                [
+                    ("company_id", "=", self.company.id),
+                    ("syscoon_datev_import_guid", "in", list(guids)),
+                ],
+                ["syscoon_datev_import_guid"],
+            )
+        )
+        self.guids.update(moves.mapped("syscoon_datev_import_guid"))
+        self._checked_guids |= guids
@@ -0,0 +1,307 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from unittest.mock import patch
+
+from odoo import Command
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.addons.syscoon_financeinterface_datev_import.models.import_datev import (
+    ImportLog,
+)
+from odoo.addons.syscoon_financeinterface_datev_import.models.import_lookup import (
+    DatevImportLookup,
+)
+from odoo.tests.common import tagged
+from odoo.tools import mute_logger, split_every
+
+ROW_COUNT = 1500
+
+DATEV_HEADER = '"EXTF";700;21;"Buchungsstapel";13;20240101000000000;;"RE";"";"";\n'
+
+COLUMNS = [
+    "Umsatz (ohne Soll/Haben-Kz)",
+    "Soll/Haben-Kennzeichen",
+    "Konto",
+    "Gegenkonto (ohne BU-Schlüssel)",
+    "Belegdatum",
+    "Belegfeld 1",
+    "Buchungstext",
+    "GUID",
+]
+# padded account, debitor number, repeated GUID, text with a line break
+ROWS = [
+    '100,00;S;800;1360;0101;RE1;"Padded";guid-1',
+    '50,00;H;10001;1360;0201;RE2;"Debitor";guid-2',
+    '100,00;S;800;1360;0101;RE1;"Repeated";guid-1',
+    '25,00;S;1360;70001;0301;RE4;"Line\nbreak";guid-4',
+]
+
+
+@tagged("post_install", "-at_install")
+class TestImportDatev(AccountTestInvoicingCommon):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        guid_type = cls.env["syscoon.datev.import.assignment"].create(
+            {
+                "name": "Move GUID",
+                "type": "guid",
+                "field_type": "string",
+                "account_move_field": "syscoon_datev_import_guid",
+            }
+        )
+        config_rows = cls.env["syscoon.datev.import.config.rows"].create(
+            {"name": "GUID", "assignment_type": guid_type.id}
+        )
+        for xmlid in (
+            "umsatz",
+            "sollhaben",
+            "konto",
+            "gegenkonto",
+            "belegdatum",
+            "beleg1",
+            "buchungstext",
+        ):
+            config_rows |= cls.env.ref(f"syscoon_financeinterface_datev_import.{xmlid}")
+        cls.template = cls.env["syscoon.datev.import.config"].create(
+            {
+                "name": "Test Import",
+                "chunk_size": 500,
+                "remove_datev_header": True,
+                "import_config_row_ids": [Command.set(config_rows.ids)],
+            }
+        )
+        cls.datev_import = cls.env["syscoon.datev.import"].create(
+            {
+                "description": "Test Import",
+                "journal_id": cls.company_data["default_journal_misc"].id,
+                "template_id": cls.template.id,
+            }
+        )
+        cls.padded_account = cls.env["account.account"].create(
+            {"code": "0800", "name": "Padded Account", "account_type": "asset_current"}
+        )
+        cls.bank_account = cls.env["account.account"].create(
+            {"code": "1360", "name": "Transit Account", "account_type": "asset_current"}
+        )
+        cls.partner_a.debitor_number = "10001"
+        cls.partner_b.creditor_number = "70001"
+
+    def _attach_csv(self, rows=ROWS):
+        """Attaches the CSV file of the rows with the DATEV header to the import"""
+        content = DATEV_HEADER + ";".join(COLUMNS) + "\n" + "\n".join(rows) + "\n"
+        self.env["ir.attachment"].create(
+            {
+                "name": "EXTF_Buchungsstapel.csv",
+                "res_model": self.datev_import._name,
+                "res_id": self.datev_import.id,
+                "raw": content.encode(self.template.encoding),
+            }
+        )
+
+    def _convert_rows(self, rows=ROWS):
+        """Returns the converted rows of the CSV text without DATEV header"""
+        content = ";".join(COLUMNS) + "\n" + "\n".join(rows) + "\n"
+        return list(self.datev_import.convert_lines(content))
+
+    def test_lookup(self):
+        lookup = self.datev_import._prepare_import_lookup()
+        self.assertEqual(
+            lookup.get_object("account.account", "code", "800", 4), self.padded_account
+        )
+        self.assertEqual(
+            lookup.get_object("account.account", "code", "800", 4),
+            self.datev_import.get_object("account.account", "code", "800", 4),
+        )
+        self.assertEqual(lookup.get_partners("debitor", "10001"), self.partner_a)
+        self.assertEqual(lookup.get_partners("creditor", "70001"), self.partner_b)
+        self.assertFalse(lookup.get_partners("debitor", "70001"))
+        moves = self.datev_import.create_values(self._convert_rows(ROWS[:2]), lookup)
+        debit_line, credit_line = (line[2] for line in moves[0]["line_ids"])
+        self.assertEqual(debit_line["account_id"], self.padded_account.id)
+        self.assertEqual(debit_line["debit"], 100.0)
+        self.assertEqual(credit_line["account_id"], self.bank_account.id)
+        self.assertEqual(credit_line["credit"], 100.0)
+        debit_line, credit_line = (line[2] for line in moves[1]["line_ids"])
+        self.assertEqual(
+            debit_line["account_id"], self.partner_a.property_account_receivable_id.id
+        )
+        self.assertEqual(debit_line["partner_id"], self.partner_a.id)
+        self.assertEqual(debit_line["credit"], 50.0)
+        self.assertEqual(credit_line["partner_id"], self.partner_a.id)
+
+    def test_check_can_created(self):
+        rows = self._convert_rows(
+            [ROWS[0], 'abc;S;9999;1360;;RE2;"Invalid";guid-2', ROWS[1]]
+        )
+        self.assertFalse(self.datev_import.check_can_created(rows[::2]))
+        # the required fields are checked before the values of every row
+        self.assertEqual(
+            self.datev_import.check_can_created(rows, start=10),
+            [
+                ImportLog(11, "Missing Required Field Accounting Date.", "error"),
+                ImportLog(
+                    11, "Umsatz (ohne Soll/Haben-Kz) cant be converted.", "error"
+                ),
+                ImportLog(11, "9999 does not exist. Please Check.", "error"),
+                ImportLog(
+                    11, "Belegdatum does not fit to %d%m. Please Check.", "error"
+                ),
+            ],
+        )
+
+    def test_read_import_batches(self):
+        self._attach_csv()
+        batches = list(self.datev_import._read_import_batches(batch_size=3))
+        self.assertEqual(
+            [(start, len(rows)) for start, rows in batches], [(1, 3), (4, 1)]
+        )
+        rows = [row for _start, rows in batches for row in rows]
+        # the rows of the file are the ones of the text without DATEV header
+        self.assertEqual(
+            [{key: v["import_value"] for key, v in row.items()} for row in rows],
+            [
+                {key: v["import_value"] for key, v in row.items()}
+                for row in self._convert_rows()
+            ],
+        )
+        self.assertEqual(
+            rows[0]["Gegenkonto (ohne BU-Schlüssel)"]["import_value"], "1360"
+        )
+        self.assertEqual(rows[3]["Buchungstext"]["import_value"], "Line\nbreak")
+        self.assertEqual(rows[3]["GUID"]["import_value"], "guid-4")
+
+    def _run_chunks(self, created_rows, fail_at=None):
+        """Creates the moves of ROW_COUNT rows, the rows are their numbers and
+        the rows passed to create_values are added to created_rows"""
+
+        def read_import_batches(datev_import, batch_size=1000):
+            start = 1
+            for rows in split_every(batch_size, range(1, ROW_COUNT + 1)):
+                yield start, rows
+                start += len(rows)
+
+        def create_values(datev_import, rows, lookup=None):
+            if fail_at in rows:
+                raise ValueError("Interrupted")
+            created_rows.extend(rows)
+            return []
+
+        import_cls = type(self.datev_import)
+        with patch.object(
+            import_cls,
+            "_read_import_batches",
+            autospec=True,
+            side_effect=read_import_batches,
+        ), patch.object(
+            import_cls, "create_values", autospec=True, side_effect=create_values
+        ):
+            self.datev_import._create_moves_in_chunks(lookup=None)
+
+    def test_resume_move_creation(self):
+        created_rows = []
+        with self.assertRaises(ValueError):
+            self._run_chunks(created_rows, fail_at=700)
+        self.assertEqual(self.datev_import.imported_rows, 500)
+        # the chunk boundaries of the resumed run differ from the checkpoint
+        self.template.chunk_size = 1000
+        self._run_chunks(created_rows)
+        self.assertEqual(created_rows, list(range(1, ROW_COUNT + 1)))
+        self.assertEqual(self.datev_import.imported_rows, ROW_COUNT)
+        self.datev_import.reset_import()
+        self.assertFalse(self.datev_import.imported_rows)
+
+    def test_resume_import(self):
+        self._attach_csv()
+        self.template.chunk_size = 2
+        import_cls = type(self.datev_import)
+        create_moves = import_cls.create_moves
+        created_moves = []
+
+        def create_moves_once(datev_import, moves):
+            if created_moves:
+                raise ValueError("Interrupted")
+            created_moves.append(moves)
+            return create_moves(datev_import, moves)
+
+        with patch.object(
+            import_cls, "create_moves", autospec=True, side_effect=create_moves_once
+        ), self.assertRaises(ValueError):
+            self.datev_import.start_import()
+        self.assertEqual(self.datev_import.imported_rows, 2)
+        self.assertEqual(len(self.datev_import.account_move_ids), 2)
+        # the chunk boundaries of the resumed run differ from the checkpoint
+        self.template.chunk_size = 3
+        self.datev_import.start_import()
+        self.assertEqual(self.datev_import.state, "imported")
+        self.assertEqual(self.datev_import.imported_rows, len(ROWS))
+        self.assertEqual(
+            sorted(
+                self.datev_import.account_move_ids.mapped("syscoon_datev_import_guid")
+            ),
+            ["guid-1", "guid-2", "guid-4"],
+        )
+
+    def test_import_guids(self):
+        self._attach_csv()
+        other_company_data = self.setup_other_company()
+        # a GUID is unique per company
+        self.env["account.move"].create(
+            [
+                {
+                    "journal_id": self.company_data["default_journal_misc"].id,
+                    "syscoon_datev_import_guid": "guid-2",
+                },
+                {
+                    "journal_id": other_company_data["default_journal_misc"].id,
+                    "syscoon_datev_import_guid": "guid-4",
+                },
+            ]
+        )
+        self.datev_import.start_import()
+        self.assertEqual(self.datev_import.state, "imported")
+        moves = self.datev_import.account_move_ids
+        self.assertEqual(
+            sorted(moves.mapped("syscoon_datev_import_guid")), ["guid-1", "guid-4"]
+        )
+        move = moves.filtered(lambda m: m.syscoon_datev_import_guid == "guid-4")
+        self.assertEqual(move.line_ids.partner_id, self.partner_b)
+        self.assertEqual(
+            move.line_ids.account_id,
+            self.bank_account | self.partner_b.property_account_payable_id,
+        )
+        logs = self.datev_import.log_line.sorted("id")
+        self.assertEqual(
+            [(log.line, log.name) for log in logs if log.state == "warning"],
+            [("2", "GUID with GUID guid-2 already exist and can not be imported")],
+        )
+        self.assertEqual(
+            [log.name for log in logs if log.name.startswith("Move ")],
+            ["Move RE1 imported", "Move RE4 imported"],
+        )
+
+    @mute_logger("odoo.sql_db")
+    def test_import_guid_created_meanwhile(self):
+        self._attach_csv()
+        self.template.chunk_size = 2
+        self.env["account.move"].create(
+            {
+                "journal_id": self.company_data["default_journal_misc"].id,
+                "syscoon_datev_import_guid": "guid-4",
+            }
+        )
+        # the existing GUIDs are not read, like for a move created by another
+        # import after the rows were checked
+        with patch.object(DatevImportLookup, "load_guids", autospec=True):
+            self.datev_import.start_import()
+        self.assertEqual(self.datev_import.state, "error")
+        self.assertEqual(self.datev_import.imported_rows, 2)
+        self.assertEqual(
+            sorted(
+                self.datev_import.account_move_ids.mapped("syscoon_datev_import_guid")
+            ),
+            ["guid-1", "guid-2"],
+        )
+        self.assertEqual(
+            self.datev_import.log_line.filtered(lambda log: log.state == "error").name,
+            "Move with GUID guid-4 already exists, the import stopped before its chunk.",
+        )
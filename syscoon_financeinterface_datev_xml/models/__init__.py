@@ -2,6 +2,7 @@
 # License OPL-1, See LICENSE file for full copyright and licensing details.
 from . import syscoon_financeinterface_xml
 from . import account_move
+from . import ir_actions_report
 from . import syscoon_financeinterface
 from . import res_company
 from . import res_config_settings
@@ -47,6 +47,12 @@ class AccountMove(models.Model):
     datev_bedi_export_id = fields.Many2one(
         "syscoon.financeinterface", "BEDI Export", copy=False
     )
+    datev_bedi_hash = fields.Char(
+        "BEDI Content Hash",
+        copy=False,
+        readonly=True,
+        help="Hash of the XML and the PDF attachments of the last BEDI export",
+    )
 
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # ++++++++++++++++++++++ DATEV XML Processing ++++++++++++++++
@@ -62,83 +68,77 @@ class AccountMove(models.Model):
         self._process_datev_xml_additional_info_footer(data)
 
     def _process_datev_xml_invoice_info(self, data):
-        invoice_info = etree.SubElement(data["element"], "invoice_info")
-        for key, val in self._prepare_datev_xml_invoice_info(data).items():
-            invoice_info.attrib[key] = data["key_apply"](
-                data["template_keys"], key, _float_to_string(val)
-            )
-        if order_value := data["key_apply"](data["template_keys"], "order_id", ""):
-            invoice_info.attrib["order_id"] = order_value
+        key_apply, rules = data["key_apply"], data["template_keys"]
+        attrib = {
+            key: key_apply(rules, key, _float_to_string(val))
+            for key, val in self._prepare_datev_xml_invoice_info(data).items()
+        }
+        if order_value := key_apply(rules, "order_id", ""):
+            attrib["order_id"] = order_value
+        etree.SubElement(data["element"], "invoice_info", attrib)
 
     def _process_datev_xml_accounting_info(self, data):
         if data["mode"] == "extended":
-            account_info = etree.SubElement(data["element"], "accounting_info")
-            for key, val in self._prepare_datev_xml_accounting_info(data).items():
-                account_info.attrib[key] = val
+            etree.SubElement(
+                data["element"],
+                "accounting_info",
+                self._prepare_datev_xml_accounting_info(data),
+            )
 
     def _process_datev_xml_invoice_party(self, data):
-        invoice_party = etree.SubElement(data["element"], "invoice_party")
-        for key, val in self._prepare_datev_xml_invoice_party(data).items():
-            if key == "vat_id":
-                invoice_party.attrib[key] = data["key_apply"](
-                    data["template_keys"], key, _float_to_string(val)
-                )
-            if key == "address":
-                invoice_party.append(_etree_subelement(key, val))
-            if key == "account":
-                invoice_party.append(_etree_subelement(key, val))
-            if key == "booking_info_bp":
-                invoice_party.append(_etree_subelement(key, val))
+        self._process_datev_xml_party(
+            data, "invoice_party", self._prepare_datev_xml_invoice_party(data)
+        )
 
     def _process_datev_xml_supplier_party(self, data):
-        supplier_party = etree.SubElement(data["element"], "supplier_party")
-        for key, val in self._prepare_datev_xml_supplier_party(data).items():
+        self._process_datev_xml_party(
+            data, "supplier_party", self._prepare_datev_xml_supplier_party(data)
+        )
+
+    def _process_datev_xml_party(self, data, tag, vals):
+        party = etree.SubElement(data["element"], tag)
+        for key, val in vals.items():
             if key == "vat_id":
-                supplier_party.attrib[key] = data["key_apply"](
+                party.attrib[key] = data["key_apply"](
                     data["template_keys"], key, _float_to_string(val)
                 )
-            if key == "address":
-                supplier_party.append(_etree_subelement(key, val))
-            if key == "account":
-                supplier_party.append(_etree_subelement(key, val))
-            if key == "booking_info_bp":
-                supplier_party.append(_etree_subelement(key, val))
+            elif key in ("address", "account", "booking_info_bp"):
+                _etree_subelement(party, key, val)
 
     def _process_datev_xml_payment_conditions(self, data):
         if data["mode"] == "extended" and self.invoice_payment_term_id:
-            payment_conditions = etree.SubElement(data["element"], "payment_conditions")
-            for key, val in self._prepare_datev_xml_payment_conditions(data).items():
-                payment_conditions.attrib[key] = data["key_apply"](
-                    data["template_keys"], key, _float_to_string(val)
-                )
+            key_apply, rules = data["key_apply"], data["template_keys"]
+            vals = self._prepare_datev_xml_payment_conditions(data)
+            etree.SubElement(
+                data["element"],
+                "payment_conditions",
+                {
+                    key: key_apply(rules, key, _float_to_string(val))
+                    for key, val in vals.items()
+                },
+            )
 
     def _process_datev_xml_invoice_item_list(self, data):
+        key_apply, rules = data["key_apply"], data["template_keys"]
         for item in self._prepare_datev_xml_invoice(data):
             invoice_item_list = etree.SubElement(data["element"], "invoice_item_list")
             for key, val in item.items():
-                if key == "description_short":
-                    invoice_item_list.attrib[key] = data["key_apply"](
-                        data["template_keys"], key, _float_to_string(val)
-                    )
-                if key == "quantity":
-                    invoice_item_list.attrib[key] = data["key_apply"](
-                        data["template_keys"], key, _float_to_string(val)
+                if key in ("description_short", "quantity"):
+                    invoice_item_list.attrib[key] = key_apply(
+                        rules, key, _float_to_string(val)
                     )
-                if key == "price_line_amount":
-                    invoice_item_list.append(_etree_subelement(key, val))
-                if key == "accounting_info":
-                    invoice_item_list.append(_etree_subelement(key, val))
+                elif key in ("price_line_amount", "accounting_info"):
+                    _etree_subelement(invoice_item_list, key, val)
 
     def _process_datev_xml_total_amount(self, data):
+        key_apply, rules = data["key_apply"], data["template_keys"]
         total_amount = etree.SubElement(data["element"], "total_amount")
         for key, val in self._prepare_datev_xml_total_amount(data).items():
-            if key != "tax_line":
-                total_amount.attrib[key] = data["key_apply"](
-                    data["template_keys"], key, _float_to_string(val)
-                )
             if key == "tax_line":
                 for line in val:
-                    total_amount.append(_etree_subelement(key, line))
+                    _etree_subelement(total_amount, key, line)
+            else:
+                total_amount.attrib[key] = key_apply(rules, key, _float_to_string(val))
 
     def _process_datev_xml_additional_info_footer(self, data):
         if not self.narration:
@@ -160,23 +160,9 @@ class AccountMove(models.Model):
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # ++++++++++++++++++++++ DATEV XML Preparing +++++++++++++++++
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-    def _prepare_datev_xml_invoice(self, data):  # noqa: C901
+    def _prepare_datev_xml_invoice(self, data):
         vals = []
         total_invoice_amount = 0.0
-        checked_keys = [
-            ("price_line_amount", "tax"),
-            ("accounting_info", "account_no"),
-            ("accounting_info", "cost_category_id"),
-            ("accounting_info", "cost_category_id2"),
-            ("accounting_info", "bu_code"),
-        ]
-
-        def is_matching(vals_1, vals_2):
-            return all(
-                vals_1[key].get(child_key) == vals_2[key].get(child_key)
-                for key, child_key in checked_keys
-            )
-
         for line in self.invoice_line_ids:
             if (
                 line.display_type not in ["line_section", "line_note"]
@@ -184,48 +170,7 @@ class AccountMove(models.Model):
             ):
                 vals.append(line._prepare_datev_xml_invoice_line(data))
         if self.env.company.export_xml_group_lines and data["mode"] == "extended":
-            new_vals = []
-            for val in vals:
-                if not any(is_matching(new_val, val) for new_val in new_vals):
-                    new_vals.append(val)
-                else:
-                    for new_val in new_vals:
-                        if not is_matching(new_val, val):
-                            continue
-                        new_val["description_short"] = _("Grouped Invoice Line")
-                        new_val["quantity"] += val["quantity"]
-                        amount_vals = val["price_line_amount"]
-                        new_amount_vals = new_val["price_line_amount"]
-                        gross_amount = amount_vals["gross_price_line_amount"]
-                        net_amount = amount_vals["net_price_line_amount"]
-                        if amount_vals.get("tax_amount"):
-                            new_amount_vals["tax_amount"] += amount_vals["tax_amount"]
-                        new_amount_vals["gross_price_line_amount"] += gross_amount
-                        new_amount_vals["net_price_line_amount"] += net_amount
-                        break
-            for count, new_val in enumerate(new_vals):
-                if new_val["price_line_amount"]["net_price_line_amount"] == 0.0:
-                    new_vals.pop(count)
-                    continue
-                new_amount_vals = new_val["price_line_amount"]
-                new_val["quantity"] = 1.0
-                if new_amount_vals.get("tax_amount"):
-                    new_val["price_line_amount"][
-                        "gross_price_line_amount"
-                    ] = self.currency_id.round(
-                        new_val["price_line_amount"]["net_price_line_amount"]
-                        * (100 + new_val["price_line_amount"]["tax"])
-                        / 100
-                    )
-                    new_val["price_line_amount"]["tax_amount"] = (
-                        new_val["price_line_amount"]["gross_price_line_amount"]
-                        - new_val["price_line_amount"]["net_price_line_amount"]
-                    )
-                    if new_val["price_line_amount"].get("tax_amount") and float_repr(
-                        new_val["price_line_amount"]["tax_amount"], 2
-                    ) in ["0.00", "-0.00"]:
-                        new_val["price_line_amount"].pop("tax_amount")
-            vals = new_vals
+            vals = self._group_datev_xml_invoice_lines(vals)
         for val in vals:
             price_line_ammount = dict(val["price_line_amount"])
             if "gross_price_line_amount" in price_line_ammount:
@@ -254,6 +199,61 @@ class AccountMove(models.Model):
                 vals.append(last_val)
         return vals
 
+    def _get_datev_xml_group_key(self, val):
+        """Returns the values of an invoice line that must be equal to group it"""
+        return (
+            val["price_line_amount"].get("tax"),
+            val["accounting_info"].get("account_no"),
+            val["accounting_info"].get("cost_category_id"),
+            val["accounting_info"].get("cost_category_id2"),
+            val["accounting_info"].get("bu_code"),
+        )
+
+    def _group_datev_xml_invoice_lines(self, vals):
+        """Sums up the invoice lines with the same group key, the groups keep the
+        order of their first line and groups without net amount are left out"""
+        groups = {}
+        for val in vals:
+            group_key = self._get_datev_xml_group_key(val)
+            group = groups.get(group_key)
+            if group is None:
+                groups[group_key] = val
+                continue
+            group["description_short"] = _("Grouped Invoice Line")
+            group["quantity"] += val["quantity"]
+            amount_vals = val["price_line_amount"]
+            group_amount_vals = group["price_line_amount"]
+            if amount_vals.get("tax_amount"):
+                group_amount_vals["tax_amount"] = (
+                    group_amount_vals.get("tax_amount", 0.0) + amount_vals["tax_amount"]
+                )
+            group_amount_vals["gross_price_line_amount"] += amount_vals[
+                "gross_price_line_amount"
+            ]
+            group_amount_vals["net_price_line_amount"] += amount_vals[
+                "net_price_line_amount"
+            ]
+        new_vals = []
+        for group in groups.values():
+            amount_vals = group["price_line_amount"]
+            if amount_vals["net_price_line_amount"] == 0.0:
+                continue
+            group["quantity"] = 1.0
+            if amount_vals.get("tax_amount"):
+                amount_vals["gross_price_line_amount"] = self.currency_id.round(
+                    amount_vals["net_price_line_amount"]
+                    * (100 + amount_vals["tax"])
+                    / 100
+                )
+                amount_vals["tax_amount"] = (
+                    amount_vals["gross_price_line_amount"]
+                    - amount_vals["net_price_line_amount"]
+                )
+                if float_repr(amount_vals["tax_amount"], 2) in ["0.00", "-0.00"]:
+                    amount_vals.pop("tax_amount")
+            new_vals.append(group)
+        return new_vals
+
     def _prepare_datev_xml_invoice_party(self, data):
         if self.move_type in ["out_invoice", "out_refund"]:
             partner = self.commercial_partner_id
@@ -405,40 +405,10 @@ class AccountMove(models.Model):
             else:
                 vals["net_total_amount"] = self.amount_untaxed
         vals["currency"] = self.currency_id.name or "EUR"
-        tax_lines = self.line_ids.filtered(lambda line: line.tax_line_id)
-        tax_key_lines = self.line_ids.filtered(lambda line: line.tax_ids)
-        currency_rate = 1.0
-        if self.currency_id and self.currency_id != self.env.company.currency_id:
-            currency_rate = self.company_id.currency_id._convert(
-                1.0, self.currency_id, self.company_id, self.date, round=False
-            )
-        result = {}
-        done_taxes = set()
-        for line in tax_lines:
-            result.setdefault(
-                line.tax_line_id.tax_group_id,
-                {"rate": 0.0, "base": 0.0, "amount": 0.0, "currency_amount": 0.0},
-            )
-            result[line.tax_line_id.tax_group_id]["rate"] = line.tax_line_id.amount
-            result[line.tax_line_id.tax_group_id]["amount"] += abs(line.balance)
-            tax_key_add_base = (line.tax_line_id.id,)
-            base_amount = line.tax_base_amount * currency_rate
-            if tax_key_add_base not in done_taxes:
-                # The base should be added ONCE
-                result[line.tax_line_id.tax_group_id]["base"] += base_amount
-                done_taxes.add(tax_key_add_base)
-        for line in tax_key_lines:
-            result.setdefault(
-                line.tax_ids[0].tax_group_id,
-                {"rate": 0.0, "base": 0.0, "amount": 0.0, "currency_amount": 0.0},
-            )
-            if line.tax_ids[0].amount == 0.0:
-                result[line.tax_ids[0].tax_group_id]["base"] += (
-                    -line.debit + line.credit
-                ) * currency_rate
-                result[line.tax_ids[0].tax_group_id][
-                    "currency_amount"
-                ] += -line.amount_currency
+        tax_summaries = data.get("tax_summaries") or {}
+        if self.id not in tax_summaries:
+            tax_summaries = self._prepare_datev_xml_tax_summaries()
+        currency_rate, result = tax_summaries[self.id]
         vals["tax_line"] = self._prepare_datev_xml_tax_line(data, currency_rate, result)
         if not vals["tax_line"]:
             line_vals = {}
@@ -447,6 +417,100 @@ class AccountMove(models.Model):
             vals["tax_line"].append(line_vals)
         return vals
 
+    def _get_datev_xml_currency_rate(self, rates):
+        """Returns the rate from the company currency into the currency of the
+        move, rates caches the rates by company, currency and date"""
+        if not self.currency_id or self.currency_id == self.env.company.currency_id:
+            return 1.0
+        key = (self.company_id, self.currency_id, self.date)
+        if key not in rates:
+            rates[key] = self.company_id.currency_id._convert(
+                1.0, self.currency_id, self.company_id, self.date, round=False
+            )
+        return rates[key]
+
+    def _prepare_datev_xml_tax_summaries(self):
+        """Returns the currency rate and the amounts by tax group of the moves by
+        their id, read with one aggregated query for all moves. A tax line adds its
+        amount to the group of its tax and the base once per tax, a base line adds
+        its balance to the group of its first tax if the tax has no rate. The groups
+        are ordered by their first tax line, then by their first base line."""
+        rates = {}
+        summaries = {
+            move.id: (move._get_datev_xml_currency_rate(rates), {}) for move in self
+        }
+        if not self:
+            return summaries
+        self.env["account.move.line"].flush_model(
+            [
+                "move_id",
+                "tax_line_id",
+                "tax_ids",
+                "balance",
+                "debit",
+                "credit",
+                "amount_currency",
+            ]
+        )
+        self.env["account.tax"].flush_model(["tax_group_id", "amount", "sequence"])
+        self.env.cr.execute(
+            """WITH base_line AS (
+                   SELECT DISTINCT ON (line.id) line.id, line.move_id,
+                          tax.tax_group_id, tax.amount,
+                          line.credit - line.debit AS base,
+                          line.amount_currency
+                     FROM account_move_line line
+                     JOIN account_move_line_account_tax_rel rel
+                       ON rel.account_move_line_id = line.id
+                     JOIN account_tax tax ON tax.id = rel.account_tax_id
+                    WHERE line.move_id IN %s
+                 ORDER BY line.id, tax.sequence, tax.id
+               )
+               SELECT line.move_id, tax.tax_group_id, MIN(line.id), MAX(line.id),
+                      (ARRAY_AGG(tax.amount ORDER BY line.id DESC))[1],
+                      SUM(ABS(line.balance)), 0.0, 0.0, MIN(line.id)
+                 FROM account_move_line line
+                 JOIN account_tax tax ON tax.id = line.tax_line_id
+                WHERE line.move_id IN %s
+             GROUP BY line.move_id, tax.tax_group_id, line.tax_line_id
+            UNION ALL
+               SELECT move_id, tax_group_id, NULL, NULL, NULL, 0.0,
+                      SUM(base) FILTER (WHERE amount = 0.0),
+                      SUM(-amount_currency) FILTER (WHERE amount = 0.0),
+                      MIN(id)
+                 FROM base_line
+             GROUP BY move_id, tax_group_id
+             ORDER BY 3 NULLS LAST, 9""",
+            (tuple(self.ids), tuple(self.ids)),
+        )
+        rows = self.env.cr.fetchall()
+        # tax_base_amount is not stored, it is computed for all first tax lines
+        tax_lines = self.env["account.move.line"].browse(
+            [row[2] for row in rows if row[2]]
+        )
+        tax_base_amounts = {line.id: line.tax_base_amount for line in tax_lines}
+        tax_groups = self.env["account.tax.group"].browse(list({row[1] for row in rows}))
+        tax_groups = {group.id: group for group in tax_groups}
+        last_line_ids = {}
+        for row in rows:
+            move_id, group_id, first_id, last_id, rate, amount, base, currency = row[:8]
+            currency_rate, result = summaries[move_id]
+            values = result.setdefault(
+                tax_groups[group_id],
+                {"rate": 0.0, "base": 0.0, "amount": 0.0, "currency_amount": 0.0},
+            )
+            if first_id:
+                # The rate is the one of the last tax line of the group
+                if last_id > last_line_ids.get((move_id, group_id), 0):
+                    last_line_ids[(move_id, group_id)] = last_id
+                    values["rate"] = rate
+                values["amount"] += float(amount)
+                values["base"] += tax_base_amounts[first_id] * currency_rate
+            else:
+                values["base"] += float(base or 0.0) * currency_rate
+                values["currency_amount"] += float(currency or 0.0)
+        return summaries
+
     def _prepare_datev_xml_tax_line(self, data, currency_rate, result_values):
         value_list = []
         result_values = sorted(result_values.items(), key=lambda l: l[0].sequence)
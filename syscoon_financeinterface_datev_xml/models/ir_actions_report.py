@@ -0,0 +1,21 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from odoo import models
+
+
+class IrActionsReport(models.Model):
+    _inherit = "ir.actions.report"
+
+    def _render_qweb_pdf_prepare_streams(self, report_ref, data, res_ids=None):
+        """Keeps the PDF of every record the report could be split into in the
+        dictionary of the context key datev_xml_pdf_contents, the streams are
+        closed by _render_qweb_pdf after they are merged"""
+        collected_streams = super()._render_qweb_pdf_prepare_streams(
+            report_ref, data, res_ids=res_ids
+        )
+        contents = self.env.context.get("datev_xml_pdf_contents")
+        if contents is not None:
+            for res_id, stream_data in collected_streams.items():
+                if res_id and (stream := stream_data.get("stream")):
+                    contents[res_id] = stream.getvalue()
+        return collected_streams
@@ -25,3 +25,8 @@ class ResCompany(models.Model):
         help="If disabled no analytic account will be exported.",
         default=True,
     )
+    export_xml_partner_preflight = fields.Boolean(
+        "Check Partners First",
+        help="Check the address and account data of all partners before the XML "
+        "files are built and stop the export with a list of the incomplete partners.",
+    )
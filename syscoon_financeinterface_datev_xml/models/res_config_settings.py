@@ -15,3 +15,6 @@ class SyscoonFinanceinterfaceConfigSettings(models.TransientModel):
     company_export_xml_analytic_accounts = fields.Boolean(
         related="company_id.export_xml_analytic_accounts", readonly=False
     )
+    company_export_xml_partner_preflight = fields.Boolean(
+        related="company_id.export_xml_partner_preflight", readonly=False
+    )
@@ -1,8 +1,7 @@
 # © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
 # License OPL-1, See LICENSE file for full copyright and licensing details.
-import base64
+import hashlib
 import logging
-import os
 import re
 import tempfile
 import zipfile
@@ -10,13 +9,22 @@ from collections import namedtuple
 from functools import partial
 from itertools import chain
 
-from lxml import etree
 from odoo import Command, _, api, fields, models
 from odoo.exceptions import UserError, ValidationError
-from odoo.tools import pdf
+from odoo.tools import config, pdf, split_every
+
+from .utilities import DOCUMENT_XSD, INVOICE_XSD, _validate_xml
 
 _logger = logging.getLogger(__name__)
 
+# size up to which the ZIP archive of the export is kept in memory
+ZIP_SPOOL_SIZE = 32 * 1024 * 1024
+
+AttachmentInfo = namedtuple(
+    "AttachmentInfo", ["xml_count", "pdf_count", "xml_id", "pdf_ids"]
+)
+NO_ATTACHMENTS = AttachmentInfo(0, 0, False, [])
+
 
 class SyscoonFinanceinterface(models.Model):
     """Inherits the basic class to provide the export for DATEV ASCII"""
@@ -46,7 +54,9 @@ class SyscoonFinanceinterface(models.Model):
         string="Invoices",
     )
     exclude_bedi_exported = fields.Boolean(
-        string="Exclude BEDI", help="Exclude already exported BEDI invoices"
+        string="Exclude BEDI",
+        help="Exclude the already exported BEDI invoices whose XML and PDF "
+        "attachments have not changed since their export",
     )
     bedi_moves_ids = fields.One2many(
         "account.move", "datev_bedi_export_id", readonly=True
@@ -81,8 +91,11 @@ class SyscoonFinanceinterface(models.Model):
         inv_pdfs = []
         new_moves = vals["moves_ok"]
         new_xmls = []
+        pdf_datas = self._get_invoice_pdf_datas(
+            vals["moves_ok"], vals.get("attachments")
+        )
         for i, move in enumerate(vals["moves_ok"]):
-            invoice_pdf, errors = self.get_invoice_pdf(move)
+            invoice_pdf, errors = self._merge_invoice_pdf(move, pdf_datas[move.id])
             if invoice_pdf:
                 inv_pdfs.append(invoice_pdf)
                 new_xmls.append(vals["move_xmls"][i])
@@ -107,14 +120,8 @@ class SyscoonFinanceinterface(models.Model):
 
         invoice_mode = self.xml_mode
         invoice_selection = self.xml_invoices
-        exclude_bedi_exported = self.exclude_bedi_exported == "bedi"
         invoice_type = []
-        self.write(
-            {
-                "xml_mode": invoice_mode,
-                "exclude_bedi_exported": exclude_bedi_exported,
-            }
-        )
+        self.write({"xml_mode": invoice_mode})
         if invoice_selection in ["customers", "both"]:
             invoice_type.extend(["out_invoice", "out_refund"])
         if invoice_selection in ["vendors", "both"]:
@@ -127,45 +134,78 @@ class SyscoonFinanceinterface(models.Model):
         ]
         if invoice_mode != "bedi":
             move_domain.append(("export_id", "=", False))
-        if exclude_bedi_exported:
-            move_domain.append(("datev_bedi_export_id", "=", False))
         moves = self.env["account.move"].search(move_domain)
         if not moves:
             raise UserError(
                 _("There are no invoices to export in the selected date range!")
             )
         vals = self.generate_export_invoices(invoice_mode, moves)
-        with tempfile.TemporaryDirectory() as export_path:
-            invoice_pdfs = self._prepare_invoice_pdfs(vals)
-            move_numbers = vals["moves_ok"].mapped(clean_move_number)
-            invoice_docs = zip(
-                vals["moves_ok"], move_numbers, vals["move_xmls"], invoice_pdfs
-            )
-            docs = map(partial(self.write_export_invoice, export_path), invoice_docs)
-            doc_paths, doc_errors = self.write_docs(docs, export_path, invoice_mode)
+        if invoice_mode == "bedi":
+            self._prepare_bedi_hashes(vals)
+        invoice_pdfs = self._prepare_invoice_pdfs(vals)
+        move_numbers = vals["moves_ok"].mapped(clean_move_number)
+        invoice_docs = zip(
+            vals["moves_ok"], move_numbers, vals["move_xmls"], invoice_pdfs
+        )
+        with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_SIZE) as zip_file:
+            with zipfile.ZipFile(
+                zip_file, "w", compression=zipfile.ZIP_DEFLATED
+            ) as archive:
+                docs = map(
+                    partial(self.write_export_invoice, archive, invoice_mode),
+                    invoice_docs,
+                )
+                doc_names, doc_errors = self.write_docs(docs, archive, invoice_mode)
             if doc_errors:
                 vals["error_str"] += "\n".join(doc_errors)
                 vals["error_str"] += "\n"
-            if doc_paths and vals["moves_ok"]:
-                zip_file = self.make_zip_file(export_path, doc_paths, invoice_mode)
-                if not zip_file:
-                    vals["error_str"] += _(
-                        "No ZIP file could be created. Please check the logs."
-                    )
-                    return
-                self.env["ir.attachment"].create(
-                    {
-                        "name": f"{self.name}.zip",
-                        "store_fname": f"{self.name}.zip",
-                        "res_model": "syscoon.financeinterface",
-                        "res_id": self.id,
-                        "type": "binary",
-                        "datas": base64.b64encode(zip_file),
-                    }
-                )
+            if doc_names and vals["moves_ok"]:
+                self._create_export_attachment(f"{self.name}.zip", zip_file)
         self._link_datev_xml_accounts_move(invoice_mode, vals)
         return True
 
+    def _get_bedi_hashes(self, vals):
+        """Returns the content hash of the exported moves by their id, built of
+        their XML, their BEDI guid and the checksums of their PDF attachments"""
+        attachments = vals["attachments"]
+        pdf_ids = list(
+            chain.from_iterable(
+                attachments[move.id].pdf_ids for move in vals["moves_ok"]
+            )
+        )
+        checksums = {
+            attachment.id: attachment.checksum or ""
+            for attachment in self.env["ir.attachment"].browse(pdf_ids)
+        }
+        hashes = {}
+        for move, xml in zip(vals["moves_ok"], vals["move_xmls"]):
+            content = hashlib.sha256(xml)
+            content.update((move.datev_bedi or "").encode())
+            for pdf_id in attachments[move.id].pdf_ids:
+                content.update(checksums[pdf_id].encode())
+            hashes[move.id] = content.hexdigest()
+        return hashes
+
+    def _prepare_bedi_hashes(self, vals):
+        """Adds the content hashes of the moves to vals, with Exclude BEDI the
+        already exported moves with an unchanged hash are left out of the export"""
+        hashes = vals["bedi_hashes"] = self._get_bedi_hashes(vals)
+        if not self.exclude_bedi_exported:
+            return
+        move_ids, move_xmls = [], []
+        for move, xml in zip(vals["moves_ok"], vals["move_xmls"]):
+            if move.datev_bedi_export_id and move.datev_bedi_hash == hashes[move.id]:
+                continue
+            move_ids.append(move.id)
+            move_xmls.append(xml)
+        if vals["moves_ok"] and not move_ids:
+            raise UserError(
+                _("No invoice has changed since its last BEDI export.")
+                + vals["error_str"]
+            )
+        vals["moves_ok"] = self.env["account.move"].browse(move_ids)
+        vals["move_xmls"] = move_xmls
+
     def _draft_datev_xml(self):
         self.env["ir.attachment"].search(
             [
@@ -186,7 +226,9 @@ class SyscoonFinanceinterface(models.Model):
     def _link_datev_xml_accounts_move(self, invoice_mode, vals):
         ctx = {"skip_invoice_sync": True, "skip_invoice_line_sync": True}
         if invoice_mode == "bedi":
-            vals["moves_ok"].with_context(**ctx).write({"datev_bedi_export_id": self.id})
+            moves = vals["moves_ok"].with_context(**ctx)
+            moves.write({"datev_bedi_export_id": self.id})
+            self._write_bedi_hashes(moves, vals["bedi_hashes"])
         else:
             vals["moves_ok"].with_context(**ctx).write({"export_id": self.id})
             if vals["move_errors"]:
@@ -196,6 +238,20 @@ class SyscoonFinanceinterface(models.Model):
         if vals["error_str"]:
             self.write({"log": vals["error_str"]})
 
+    def _write_bedi_hashes(self, moves, hashes):
+        """Stores the content hashes of the moves with one query"""
+        if not moves:
+            return
+        moves.flush_recordset(["datev_bedi_hash"])
+        self.env.cr.execute(
+            """UPDATE account_move AS move
+                  SET datev_bedi_hash = hashes.hash
+                 FROM unnest(%s, %s) AS hashes(id, hash)
+                WHERE move.id = hashes.id""",
+            (moves.ids, [hashes[move_id] for move_id in moves.ids]),
+        )
+        moves.invalidate_recordset(["datev_bedi_hash"])
+
     def _get_missing_fields(self, partner, required_fields):
         return [
             _(
@@ -207,35 +263,53 @@ class SyscoonFinanceinterface(models.Model):
             if field in partner._fields and not partner[field]
         ]
 
-    def _check_partner_data(self, move):
-        """Check if the partner's address and account data are complete."""
+    def _get_partner_check_fields(self):
+        """Returns the required address fields and the required account fields of
+        customer and vendor invoices from the configuration"""
         param_config_obj = self.env["ir.config_parameter"].sudo()
 
-        # Read config parameters and parse comma-separated values
-        address_fields = param_config_obj.get_param(
-            "partner_check.address_fields", "street,zip,city"
-        ).split(",")
-        out_fields = param_config_obj.get_param(
-            "partner_check.account_fields.out", "debitor_number"
-        ).split(",")
-        in_fields = param_config_obj.get_param(
-            "partner_check.account_fields.in", "creditor_number"
-        ).split(",")
-
-        # Choose the right account fields
+        def _get_fields(key, default):
+            # Read config parameter and parse comma-separated values
+            value = param_config_obj.get_param(key, default)
+            return [f.strip() for f in value.split(",") if f.strip()]
+
+        return {
+            "address": _get_fields("partner_check.address_fields", "street,zip,city"),
+            "out": _get_fields("partner_check.account_fields.out", "debitor_number"),
+            "in": _get_fields("partner_check.account_fields.in", "creditor_number"),
+        }
+
+    def _prepare_partner_check_cache(self):
+        """Returns the cache of the partner checks of one export, the configuration
+        is read once and every partner is checked once per field list"""
+        return {"fields": self._get_partner_check_fields(), "partners": {}}
+
+    def _get_partner_check_fields_by_move(self, move, check_fields):
         account_fields = []
         if move.move_type in ["out_invoice", "out_refund"]:
-            account_fields = out_fields
+            account_fields = check_fields["out"]
         elif move.move_type in ["in_invoice", "in_refund"]:
-            account_fields = in_fields
-
-        # Sanitize whitespace
-        address_fields = [f.strip() for f in address_fields if f.strip()]
-        account_fields = [f.strip() for f in account_fields if f.strip()]
-        account_partner = move.commercial_partner_id
-        errors = self._get_missing_fields(
-            move.partner_id, address_fields
-        ) + self._get_missing_fields(account_partner, account_fields)
+            account_fields = check_fields["in"]
+        return [
+            (move.partner_id, check_fields["address"]),
+            (move.commercial_partner_id, account_fields),
+        ]
+
+    def _get_cached_missing_fields(self, partner, required_fields, cache):
+        key = (partner.id, tuple(required_fields))
+        if key not in cache["partners"]:
+            cache["partners"][key] = self._get_missing_fields(partner, required_fields)
+        return cache["partners"][key]
+
+    def _check_partner_data(self, move, cache=None):
+        """Check if the partner's address and account data are complete."""
+        if cache is None:
+            cache = self._prepare_partner_check_cache()
+        errors = []
+        for partner, required_fields in self._get_partner_check_fields_by_move(
+            move, cache["fields"]
+        ):
+            errors += self._get_cached_missing_fields(partner, required_fields, cache)
         if errors:
             errors = [
                 _(
@@ -246,6 +320,30 @@ class SyscoonFinanceinterface(models.Model):
             ] + errors
         return errors
 
+    def _check_partners_preflight(self, moves, cache):
+        """Checks the partners of all moves before the XML files are built and
+        raises with the list of the incomplete partners"""
+        errors = []
+        for move in moves:
+            for partner, required_fields in self._get_partner_check_fields_by_move(
+                move, cache["fields"]
+            ):
+                key = (partner.id, tuple(required_fields))
+                if key in cache["partners"]:
+                    continue
+                errors += self._get_cached_missing_fields(
+                    partner, required_fields, cache
+                )
+        if errors:
+            raise UserError(
+                _(
+                    "The following partners are incomplete, please complete them "
+                    "before the export:\n%(errors)s",
+                    errors="\n".join(errors),
+                )
+            )
+        return True
+
     def _get_existing_xml(self, move, invoice_mode):
         if invoice_mode != "x-rechnungen":
             return move.attachment_ids.filtered(lambda a: a.mimetype == "application/xml")
@@ -258,18 +356,27 @@ class SyscoonFinanceinterface(models.Model):
         move_errors = []
         moves_with_xml = []
         moves_stat = {"success": self.env["account.move"], "failed": []}
+        attachment_infos = self._classify_invoice_attachments(moves)
+        partner_cache = self._prepare_partner_check_cache()
+        tax_summaries = {}
+        if invoice_mode != "x-rechnungen":
+            tax_summaries = moves._prepare_datev_xml_tax_summaries()
+        preflight = self.company_id.export_xml_partner_preflight
+        if preflight and invoice_mode != "x-rechnungen":
+            # vendor bills with only an XML attachment are skipped below
+            self._check_partners_preflight(
+                moves.filtered(
+                    lambda m: m.move_type not in ["in_invoice", "in_refund"]
+                    or not attachment_infos[m.id].xml_count
+                    or attachment_infos[m.id].pdf_count
+                ),
+                partner_cache,
+            )
 
         for move in moves:
             try:
                 error_list = []
-
-                attachments = move.attachment_ids
-                xml_attachments = attachments.filtered(
-                    lambda a: a.mimetype == "application/xml"
-                )
-                pdf_attachments = attachments.filtered(
-                    lambda a: a.mimetype == "application/pdf"
-                )
+                attachment_info = attachment_infos[move.id]
 
                 if invoice_mode == "x-rechnungen":
                     # Only export vendor bills with exactly one XML and no PDF
@@ -283,7 +390,7 @@ class SyscoonFinanceinterface(models.Model):
                         )
                         continue
 
-                    if len(xml_attachments) != 1 or pdf_attachments:
+                    if attachment_info.xml_count != 1 or attachment_info.pdf_count:
                         move_errors.append(move.id)
                         error_str += _(
                             "%(name)s (id=%(move_id)s) skipped: Must have exactly one XML"
@@ -293,15 +400,16 @@ class SyscoonFinanceinterface(models.Model):
                         )
                         continue
 
-                    xml = xml_attachments[0].raw  # use attached XML
+                    # use attached XML
+                    xml = self.env["ir.attachment"].browse(attachment_info.xml_id).raw
 
                 else:
                     # Standard / Extended / BEDI
                     # Vendor bill with XML only, treat as X-Rechnung so skip
                     if (
                         move.move_type in ["in_invoice", "in_refund"]
-                        and xml_attachments
-                        and not pdf_attachments
+                        and attachment_info.xml_count
+                        and not attachment_info.pdf_count
                     ):
                         move_errors.append(move.id)
                         error_str += _(
@@ -314,7 +422,9 @@ class SyscoonFinanceinterface(models.Model):
 
                     # If both PDF and XML are attached,ignore XML, generate XML from move
                     # Proceed normally to generate XML
-                    xml, error_list = self.get_invoice_xml(move, invoice_mode)
+                    xml, error_list = self.get_invoice_xml(
+                        move, invoice_mode, partner_cache, tax_summaries
+                    )
 
                 if not error_list:
                     move_xmls.append(xml)
@@ -344,31 +454,102 @@ class SyscoonFinanceinterface(models.Model):
             "error_str": error_str,
             "move_xmls": move_xmls,
             "moves_ok": moves_ok,
+            "attachments": attachment_infos,
         }
 
+    def _classify_invoice_attachments(self, moves):
+        """Returns the XML and PDF attachments of the moves per move id, read with
+        one grouped query. The counts and the XML consider the attachments of the
+        move (attachment_ids), the PDFs also the ones of binary fields."""
+        attachment_infos = dict.fromkeys(moves.ids, NO_ATTACHMENTS)
+        if not moves:
+            return attachment_infos
+        self.env["ir.attachment"].flush_model(
+            ["res_model", "res_id", "res_field", "mimetype"]
+        )
+        self.env.cr.execute(
+            """SELECT res_id,
+                      COUNT(*) FILTER (WHERE mimetype = 'application/xml'
+                                         AND res_field IS NULL),
+                      COUNT(*) FILTER (WHERE mimetype = 'application/pdf'
+                                         AND res_field IS NULL),
+                      MAX(id) FILTER (WHERE mimetype = 'application/xml'
+                                        AND res_field IS NULL),
+                      ARRAY_AGG(id ORDER BY id) FILTER (
+                          WHERE mimetype = 'application/pdf')
+                 FROM ir_attachment
+                WHERE res_model = 'account.move'
+                  AND res_id IN %s
+                  AND mimetype IN ('application/xml', 'application/pdf')
+             GROUP BY res_id""",
+            (tuple(moves.ids),),
+        )
+        for res_id, *info in self.env.cr.fetchall():
+            info[3] = info[3] or []
+            attachment_infos[res_id] = AttachmentInfo._make(info)
+        return attachment_infos
+
     def get_invoice_pdf(self, moves):
         """Return the PDF report for a given invoice"""
-        content = False
+        pdf_datas = self._get_invoice_pdf_datas(moves)
+        return self._merge_invoice_pdf(
+            moves, list(chain.from_iterable(pdf_datas[move.id] for move in moves))
+        )
+
+    def _get_invoice_pdf_datas(self, moves, attachment_infos=None):
+        """Returns the contents of the PDF attachments per move, the moves without
+        a PDF attachment are rendered"""
+        if attachment_infos is None:
+            attachment_infos = self._classify_invoice_attachments(moves)
+        pdf_ids = [
+            pdf_id
+            for move in moves
+            for pdf_id in attachment_infos.get(move.id, NO_ATTACHMENTS).pdf_ids
+        ]
+        attachments = self.env["ir.attachment"].browse(pdf_ids)
+        pdf_datas = {move.id: [] for move in moves}
+        for attachment in attachments:
+            pdf_datas[attachment.res_id].append(attachment.raw)
+        if no_attachment_moves := moves.filtered(lambda m: not pdf_datas[m.id]):
+            for res_id, content in self._render_invoice_pdfs(no_attachment_moves):
+                pdf_datas[res_id].append(content)
+        return pdf_datas
+
+    def _render_invoice_pdfs(self, moves):
+        """Renders the invoice report in batches, every batch is rendered by one
+        wkhtmltopdf run and split per invoice. Yields the res_id and the content"""
         report_obj = self.env["ir.actions.report"]
-        report = namedtuple("Report", ["content", "filetype"])
-        attachments = self.env["ir.attachment"].search(
-            [
-                ("res_model", "=", "account.move"),
-                ("res_id", "in", moves.ids),
-                ("mimetype", "=", "application/pdf"),
-                "|",
-                ("res_field", "!=", False),
-                ("res_field", "=", False),
-            ],
-            order="id asc",
+        report_ref = "account.account_invoices"
+        batch_size = int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("datev_xml.pdf_render_batch_size", 50)
         )
-        pdf_datas = [base64.decodebytes(attachment.datas) for attachment in attachments]
-        res_ids = attachments.mapped("res_id")
-        if no_attachment_moves := moves.filtered(lambda m: m.id not in res_ids):
-            content, _filetype = report_obj._render_qweb_pdf(
-                "account.account_invoices", no_attachment_moves.ids
-            )
-            pdf_datas.append(content)
+        for res_ids in split_every(max(batch_size, 1), moves.ids, list):
+            contents = {}
+            if len(res_ids) > 1 and not self._is_report_rendering_disabled():
+                # rendered by _render_qweb_pdf like a single invoice, the PDFs
+                # per invoice are collected by _render_qweb_pdf_prepare_streams
+                report_obj.with_context(
+                    datev_xml_pdf_contents=contents
+                )._render_qweb_pdf(report_ref, res_ids)
+            for res_id in res_ids:
+                if not (content := contents.get(res_id)):
+                    # the report could not be split per invoice, render it alone
+                    content, _filetype = report_obj._render_qweb_pdf(
+                        report_ref, [res_id]
+                    )
+                yield res_id, content
+
+    def _is_report_rendering_disabled(self):
+        """Reports are rendered as HTML by _render_qweb_pdf in tests"""
+        return (
+            config["test_enable"] or config["test_file"]
+        ) and not self.env.context.get("force_report_rendering")
+
+    def _merge_invoice_pdf(self, moves, pdf_datas):
+        """Merges the PDF contents to the report of the invoice"""
+        report = namedtuple("Report", ["content", "filetype"])
         try:
             report_make = report._make((pdf.merge_pdf(pdf_datas), "pdf"))
             errors = False
@@ -384,110 +565,55 @@ class SyscoonFinanceinterface(models.Model):
             )
         return report_make, errors
 
-    def get_invoice_xml(self, move_id, invoice_mode):
-        """Return the XML Export for a given invoice"""
-        if errors := self._check_partner_data(move_id):
+    def get_invoice_xml(
+        self, move_id, invoice_mode, partner_cache=None, tax_summaries=None
+    ):
+        """Return the XML Export for a given invoice, tax_summaries are the ones
+        of _prepare_datev_xml_tax_summaries for all exported invoices"""
+        if errors := self._check_partner_data(move_id, partner_cache):
             return "", errors
-        schema = etree.parse(
-            os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "schemas/Belegverwaltung_online_invoice_v050.xsd",
-            )
-        )
-        schema = etree.XMLSchema(schema)
-        parser = etree.XMLParser(schema=schema, encoding="utf-8")
-        xml = self.env["syscoon.financeinterface.xml"].create_invoice_xml(
-            move_id, invoice_mode
-        )
-        try:
-            etree.fromstring(xml, parser)
-        except (etree.XMLSyntaxError, ValueError) as e:
-            errors = [self.get_error_msg(move_id)]
-            for arg in e.args:
-                errors.append(arg)
-            return "", errors
-        return xml, []
-
-    def write_export_invoice(self, dir_path, inv_doc):
-        """
-        Either both files are written or neither.
-        """
-        inv_id, name, xml, report = inv_doc
-
-        try:
-            xml_path = os.path.join(dir_path, name + ".xml")
-            if isinstance(xml, str):
-                with open(xml_path, "w", encoding="utf-8") as file:
-                    file.write(xml)
-            else:
-                with open(xml_path, "wb") as file:
-                    file.write(xml)
-            pdf_path = os.path.join(dir_path, ".".join([name, report.filetype]))
-            with open(pdf_path, "wb") as file:
-                file.write(report.content)
-            return (inv_id, name, xml_path, pdf_path)
-        except Exception:
-            _logger.error(
-                _(
-                    "An error occurred while saving %(name)s export in %(dir_path)s",
-                    name=name,
-                    dir_path=dir_path,
-                )
-            )
+        xml_obj = self.env["syscoon.financeinterface.xml"]
+        invoice = xml_obj.make_invoice_xml(move_id, invoice_mode, tax_summaries)
+        if errors := _validate_xml(invoice, INVOICE_XSD):
+            return "", [self.get_error_msg(move_id)] + errors
+        return xml_obj.serialize_xml(invoice), []
 
-    def write_export(self, dir_path, inv_doc):
+    def write_export_invoice(self, archive, invoice_mode, inv_doc):
         """
-        Either both files are written or neither.
+        Adds the XML and the PDF of the invoice to the ZIP archive, the
+        X-Rechnungen export contains only the XML, the BEDI export only the PDF.
         """
         inv_id, name, xml, report = inv_doc
-
-        xml_path = os.path.join(dir_path, name + ".xml")
-        pdf_path = os.path.join(dir_path, ".".join([name, report.filetype]))
-        try:
-            with open(xml_path, "w") as file:
-                xml = xml.decode(encoding="utf-8", errors="strict")
-                file.write(xml)
-            with open(pdf_path, "wb") as file:
-                file.write(report.content)
-            return (inv_id, name, xml_path, pdf_path)
-        except Exception:
-            _logger.error(
-                _(
-                    "An error occurred while saving %(name)s export in %(dir_path)s",
-                    name=name,
-                    dir_path=dir_path,
-                )
-            )
+        xml_name = name + ".xml"
+        pdf_name = ".".join([name, report.filetype])
+        if invoice_mode != "bedi":
+            archive.writestr(xml_name, xml)
+        if invoice_mode != "x-rechnungen":
+            archive.writestr(pdf_name, report.content)
+        return (inv_id, name, xml_name, pdf_name)
 
     @api.model
-    def write_docs(self, docs, dir_path, invoice_mode):
+    def write_docs(self, docs, archive, invoice_mode):
         """
         Consumes the docs generator and additionally
-        writes an xml file with info of the made exports
+        writes an xml file with info of the made exports.
+        The info file is built and validated once after all docs are written.
         """
         WrittenDoc = namedtuple("WrittenDoc", ["inv", "name", "xml_path", "pdf_path"])
-
-        def get_doc_paths(doc):
-            return (dir_path + "/" + doc.pdf_path, dir_path + "/" + doc.xml_path)
-
-        written_docs = []
+        written_docs = [WrittenDoc._make(doc) for doc in docs]
         errors = []
-        xml_path = False
-        for move_id, name, xml_path, pdf_path in docs:
-            xp = xml_path.replace(dir_path + "/", "")
-            pp = pdf_path.replace(dir_path + "/", "")
-            written_docs.append(WrittenDoc._make((move_id, name, xp, pp)))
+        names = []
+        if written_docs:
             xml, errors = self.get_documents_xml(written_docs, invoice_mode)
-            xml_path, file_err = self.write_export_invoice_info(dir_path, xml)
-            if file_err:
-                errors.append(file_err)
-        return (
-            filter(
-                None,
-                chain((xml_path,), *map(get_doc_paths, written_docs)),
-            ),
-            errors,
-        )
+            if xml and invoice_mode != "x-rechnungen":
+                archive.writestr("document.xml", xml)
+                names.append("document.xml")
+        for doc in written_docs:
+            if invoice_mode != "x-rechnungen":
+                names.append(doc.pdf_path)
+            if invoice_mode != "bedi":
+                names.append(doc.xml_path)
+        return names, errors
 
     def get_error_msg(self, move_id):
         return _(
@@ -496,58 +622,10 @@ class SyscoonFinanceinterface(models.Model):
             move_id=move_id.id,
         )
 
-    def make_zip_file(self, export_path, doc_path, invoice_mode):
-        timestamp = fields.Datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        zip_path = os.path.join(export_path, timestamp + ".zip")
-        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as file:
-            for path in doc_path:
-                if invoice_mode == "x-rechnungen":
-                    if path.endswith(".xml") and not path.endswith("document.xml"):
-                        file.write(path, os.path.basename(path))
-                elif invoice_mode == "bedi":
-                    if ".xml" not in path or "document.xml" in path:
-                        file.write(path, os.path.basename(path))
-                else:
-                    file.write(path, os.path.basename(path))
-        with open(zip_path, "rb") as datas_file:
-            datas_content = datas_file.read()
-        if os.path.exists(zip_path):
-            os.remove(zip_path)
-        return datas_content
-
     def get_documents_xml(self, docs, invoice_mode):
         """Return the XML Export for a given invoice"""
         xml_obj = self.env["syscoon.financeinterface.xml"]
-        schema = etree.parse(
-            os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "schemas/Document_v050.xsd",
-            )
-        )
-        schema = etree.XMLSchema(schema)
-        parser = etree.XMLParser(schema=schema, encoding="utf-8")
-        xml = xml_obj.create_documents_xml(docs, invoice_mode)
-        try:
-            etree.fromstring(xml, parser)
-        except Exception as e:
-            errors = ["documents.xml"]
-            for arg in e.args:
-                errors.append(arg)
-            return "", errors
-        return xml, []
-
-    def write_export_invoice_info(self, dir_path, xml):
-        xml_path = os.path.join(dir_path, "document.xml")
-        try:
-            with open(xml_path, "w") as file:
-                file.write(xml.decode("utf-8"))
-        except Exception as e:
-            if os.path.exists(xml_path):
-                os.remove(xml_path)
-            doc_error = _(
-                "Error while export in %(dir_path)s: %(error)s",
-                dir_path=dir_path,
-                error=e,
-            )
-            return "", doc_error
-        return xml_path, ""
+        documents = xml_obj.make_documents_xml(docs, invoice_mode)
+        if errors := _validate_xml(documents, DOCUMENT_XSD):
+            return "", ["documents.xml"] + errors
+        return xml_obj.serialize_xml(documents), []
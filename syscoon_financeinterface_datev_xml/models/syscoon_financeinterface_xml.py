@@ -9,13 +9,12 @@ class SyscoonFinanceinterfaceXML(models.AbstractModel):
     _description = "definitions for the syscoon financeinterface DATEV XML-export"
 
     def create_invoice_xml(self, move_id, invoice_mode):
-        xml = self.make_invoice_xml(move_id, invoice_mode)
-        invoice = etree.tostring(
-            xml, pretty_print=True, xml_declaration=True, encoding="UTF-8"
-        )
-        return invoice
+        return self.serialize_xml(self.make_invoice_xml(move_id, invoice_mode))
 
-    def make_invoice_xml(self, move_id, invoice_mode):
+    def serialize_xml(self, xml):
+        return etree.tostring(xml, xml_declaration=True, encoding="UTF-8")
+
+    def make_invoice_xml(self, move_id, invoice_mode, tax_summaries=None):
         attr_qname = etree.QName(
             "http://www.w3.org/2001/XMLSchema-instance", "schemaLocation"
         )
@@ -43,25 +42,24 @@ class SyscoonFinanceinterfaceXML(models.AbstractModel):
         template = interface._export_template()
 
         def _apply_template_line_config(template_keys, key, val):
-            return interface._apply_template_line_config(move_id, template_keys, key, val)
+            # Most keys have no rule, they are returned without a call
+            rule = template_keys.get(key)
+            return rule(interface, move_id, val) if rule else val
 
         data = {
             "move": move_id,
             "mode": invoice_mode,
             "element": invoice,
             "template": template,
-            "template_keys": template._template_vals(line_type="xml"),
+            "template_keys": template._template_rules(line_type="xml"),
             "key_apply": _apply_template_line_config,
+            "tax_summaries": tax_summaries,
         }
         move_id._process_datev_xml_all(data)
         return invoice
 
     def create_documents_xml(self, docs, invoice_mode):
-        xml = self.make_documents_xml(docs, invoice_mode)
-        documents = etree.tostring(
-            xml, pretty_print=True, xml_declaration=True, encoding="UTF-8"
-        )
-        return documents
+        return self.serialize_xml(self.make_documents_xml(docs, invoice_mode))
 
     def make_documents_xml(self, docs, invoice_mode):
         attr_qname = etree.QName(
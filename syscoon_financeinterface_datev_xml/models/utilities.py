@@ -1,8 +1,19 @@
 # © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
 # License OPL-1, See LICENSE file for full copyright and licensing details.
+import os
+import threading
 
 from lxml import etree
 
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schemas"
+)
+INVOICE_XSD = "Belegverwaltung_online_invoice_v050.xsd"
+DOCUMENT_XSD = "Document_v050.xsd"
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
 
 def _float_to_string(val):
     if isinstance(val, float):
@@ -10,11 +21,39 @@ def _float_to_string(val):
     return str(val)
 
 
-def _etree_subelement(tag, values):
-    elem = etree.Element(tag)
-    for key, val in values.items():
-        if val:
-            elem.attrib[key] = _float_to_string(val)
-        if key == "tax" and val == 0.0:
-            elem.attrib[key] = _float_to_string(val)
-    return elem
+def _xml_attributes(values):
+    """Returns the values as XML attributes, empty values are left out except
+    a tax rate of 0"""
+    return {
+        key: _float_to_string(val)
+        for key, val in values.items()
+        if val or (key == "tax" and val == 0.0)
+    }
+
+
+def _etree_subelement(parent, tag, values):
+    return etree.SubElement(parent, tag, _xml_attributes(values))
+
+
+def _get_xml_schema(schema_name):
+    """Returns the compiled XSD schema of the schemas folder and the lock for its
+    use, every schema is compiled once per process"""
+    schema = _schemas.get(schema_name)
+    if schema is None:
+        with _schemas_lock:
+            schema = _schemas.get(schema_name)
+            if schema is None:
+                xsd = etree.parse(os.path.join(SCHEMA_PATH, schema_name))
+                schema = (etree.XMLSchema(xsd), threading.Lock())
+                _schemas[schema_name] = schema
+    return schema
+
+
+def _validate_xml(element, schema_name):
+    """Validates the element tree against the XSD schema and returns the error
+    messages, the error log of a schema is shared so validations are serialized"""
+    schema, lock = _get_xml_schema(schema_name)
+    with lock:
+        if schema.validate(element):
+            return []
+        return [error.message for error in schema.error_log]
@@ -0,0 +1,6 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+
+from . import test_datev_xml_export_bench
+from . import test_datev_xml_schema
+from . import test_datev_xml_export
@@ -0,0 +1,292 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+import io
+import logging
+import zipfile
+from collections import namedtuple
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.addons.base.models.ir_actions_report import (
+    IrActionsReport as BaseIrActionsReport,
+)
+from odoo.exceptions import UserError
+from odoo.tests.common import tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("post_install", "-at_install")
+class TestDatevXmlExport(AccountTestInvoicingCommon):
+    @classmethod
+    def setUpClass(cls):
+        _logger.info("========== START TestDatevXmlExport ==========")
+        super().setUpClass()
+        cls.invoices = cls.env["account.move"]
+        for day in range(1, 4):
+            cls.invoices |= cls.init_invoice(
+                "out_invoice",
+                partner=cls.partner_a,
+                invoice_date=fields.Date.from_string(f"2024-01-0{day}"),
+                amounts=[100.0 * day],
+                post=True,
+            )
+        cls.interface = cls.env["syscoon.financeinterface"]
+        _logger.info("========== DONE TestDatevXmlExport ==========")
+
+    def test_write_docs_builds_document_xml_once(self):
+        interface_cls = type(self.interface)
+        report = namedtuple("Report", ["content", "filetype"])
+        zip_file = io.BytesIO()
+        with zipfile.ZipFile(zip_file, "w") as archive, patch.object(
+            interface_cls,
+            "get_documents_xml",
+            autospec=True,
+            side_effect=interface_cls.get_documents_xml,
+        ) as get_documents_xml:
+            docs = (
+                self.interface.write_export_invoice(
+                    archive,
+                    "extended",
+                    (invoice, str(invoice.id), b"<invoice/>", report(b"%PDF", "pdf")),
+                )
+                for invoice in self.invoices
+            )
+            doc_names, errors = self.interface.write_docs(docs, archive, "extended")
+            self.assertEqual(get_documents_xml.call_count, 1)
+            self.assertFalse(errors)
+        with zipfile.ZipFile(zip_file) as archive:
+            self.assertEqual(sorted(archive.namelist()), sorted(doc_names))
+        self.assertEqual(len(doc_names), 1 + 2 * len(self.invoices))
+        self.assertIn("document.xml", doc_names)
+
+    def test_write_docs_bedi(self):
+        report = namedtuple("Report", ["content", "filetype"])
+        zip_file = io.BytesIO()
+        with zipfile.ZipFile(zip_file, "w") as archive:
+            docs = (
+                self.interface.write_export_invoice(
+                    archive,
+                    "bedi",
+                    (invoice, str(invoice.id), b"<invoice/>", report(b"%PDF", "pdf")),
+                )
+                for invoice in self.invoices
+            )
+            self.interface.write_docs(docs, archive, "bedi")
+        with zipfile.ZipFile(zip_file) as archive:
+            names = archive.namelist()
+        self.assertIn("document.xml", names)
+        self.assertFalse([name for name in names if name.endswith(".xml")][1:])
+
+    def test_invoice_pdf_datas(self):
+        invoice = self.invoices[0]
+        self.env["ir.attachment"].create(
+            {
+                "name": "invoice.pdf",
+                "res_model": invoice._name,
+                "res_id": invoice.id,
+                "mimetype": "application/pdf",
+                "raw": b"%PDF-1.4 attached",
+            }
+        )
+        pdf_datas = self.interface._get_invoice_pdf_datas(self.invoices)
+        self.assertEqual(pdf_datas[invoice.id], [b"%PDF-1.4 attached"])
+        for other in self.invoices[1:]:
+            self.assertEqual(len(pdf_datas[other.id]), 1)
+            self.assertTrue(pdf_datas[other.id][0])
+
+    def _render_invoice_pdfs(self, split):
+        """Renders the invoice PDFs with fake reports, the PDF of a batch is split
+        per invoice if split is set. Returns the contents by res_id and the calls
+        of _render_qweb_pdf"""
+
+        def prepare_streams(report, report_ref, data, res_ids=None):
+            streams = {
+                res_id: {"stream": None, "attachment": None} for res_id in res_ids
+            }
+            if split or len(res_ids) == 1:
+                for res_id in res_ids:
+                    streams[res_id]["stream"] = io.BytesIO(b"%%PDF %d" % res_id)
+            else:
+                # the PDF of the batch has no outlines to split it per invoice
+                streams[False] = {"stream": io.BytesIO(b"%PDF"), "attachment": None}
+            return streams
+
+        report_cls = type(self.env["ir.actions.report"])
+        with patch.object(
+            BaseIrActionsReport,
+            "_render_qweb_pdf_prepare_streams",
+            autospec=True,
+            side_effect=prepare_streams,
+        ), patch.object(
+            report_cls,
+            "_render_qweb_pdf",
+            autospec=True,
+            side_effect=report_cls._render_qweb_pdf,
+        ) as render_qweb_pdf:
+            contents = dict(
+                self.interface.with_context(
+                    force_report_rendering=True
+                )._render_invoice_pdfs(self.invoices)
+            )
+        return contents, render_qweb_pdf.call_count
+
+    def test_render_invoice_pdfs(self):
+        expected = {invoice.id: b"%%PDF %d" % invoice.id for invoice in self.invoices}
+        contents, call_count = self._render_invoice_pdfs(split=True)
+        self.assertEqual(contents, expected)
+        self.assertEqual(call_count, 1)
+        # every invoice is rendered alone if the batch cannot be split
+        contents, call_count = self._render_invoice_pdfs(split=False)
+        self.assertEqual(contents, expected)
+        self.assertEqual(call_count, 1 + len(self.invoices))
+
+    def test_classify_invoice_attachments(self):
+        invoice, other = self.invoices[:2]
+        attachments = self.env["ir.attachment"].create(
+            [
+                {
+                    "name": name,
+                    "res_model": invoice._name,
+                    "res_id": invoice.id,
+                    "mimetype": mimetype,
+                    "raw": b"content",
+                }
+                for name, mimetype in [
+                    ("invoice.xml", "application/xml"),
+                    ("invoice.pdf", "application/pdf"),
+                    ("copy.pdf", "application/pdf"),
+                ]
+            ]
+        )
+        infos = self.interface._classify_invoice_attachments(invoice | other)
+        self.assertEqual(infos[invoice.id].xml_count, 1)
+        self.assertEqual(infos[invoice.id].pdf_count, 2)
+        self.assertEqual(infos[invoice.id].xml_id, attachments[0].id)
+        self.assertEqual(infos[invoice.id].pdf_ids, attachments[1:].ids)
+        self.assertFalse(infos[other.id].xml_count or infos[other.id].pdf_ids)
+
+    def test_partner_check_cache(self):
+        self.partner_a.street = False
+        interface_cls = type(self.interface)
+        cache = self.interface._prepare_partner_check_cache()
+        with patch.object(
+            interface_cls,
+            "_get_missing_fields",
+            autospec=True,
+            side_effect=interface_cls._get_missing_fields,
+        ) as get_missing_fields:
+            errors = [
+                self.interface._check_partner_data(invoice, cache)
+                for invoice in self.invoices
+            ]
+        # address and account fields of the one partner
+        self.assertEqual(get_missing_fields.call_count, 2)
+        self.assertTrue(all(errors))
+        self.assertEqual(errors[0][1:], errors[1][1:])
+
+    def test_partner_preflight(self):
+        self.partner_a.street = False
+        cache = self.interface._prepare_partner_check_cache()
+        with self.assertRaisesRegex(UserError, self.partner_a.name):
+            self.interface._check_partners_preflight(self.invoices, cache)
+
+    def test_group_invoice_lines(self):
+        def line_vals(account, net, tax=19.0):
+            return {
+                "description_short": f"Line {account}",
+                "quantity": 2.0,
+                "price_line_amount": {
+                    "tax": tax,
+                    "tax_amount": net * tax / 100,
+                    "gross_price_line_amount": net * (100 + tax) / 100,
+                    "net_price_line_amount": net,
+                },
+                "accounting_info": {"account_no": account, "bu_code": False},
+            }
+
+        vals = [
+            line_vals("8400", 100.0),
+            line_vals("8300", 50.0, tax=7.0),
+            line_vals("8400", -100.0),
+            line_vals("8200", 10.0),
+            line_vals("8300", 50.0, tax=7.0),
+        ]
+        groups = self.invoices[0]._group_datev_xml_invoice_lines(vals)
+        # The group of 8400 nets to zero, the following group must not be skipped
+        self.assertEqual(
+            [group["accounting_info"]["account_no"] for group in groups],
+            ["8300", "8200"],
+        )
+        self.assertEqual(groups[0]["description_short"], "Grouped Invoice Line")
+        self.assertEqual(groups[0]["quantity"], 1.0)
+        amount_vals = groups[0]["price_line_amount"]
+        self.assertAlmostEqual(amount_vals["net_price_line_amount"], 100.0)
+        self.assertAlmostEqual(amount_vals["tax_amount"], 7.0)
+        self.assertEqual(groups[1]["description_short"], "Line 8200")
+
+    def test_tax_summaries(self):
+        summaries = self.invoices._prepare_datev_xml_tax_summaries()
+        self.assertEqual(set(summaries), set(self.invoices.ids))
+        for invoice in self.invoices:
+            currency_rate, result = summaries[invoice.id]
+            tax = invoice.invoice_line_ids.tax_ids
+            self.assertEqual(currency_rate, 1.0)
+            self.assertEqual(list(result), [tax.tax_group_id])
+            values = result[tax.tax_group_id]
+            self.assertEqual(values["rate"], tax.amount)
+            self.assertAlmostEqual(values["amount"], invoice.amount_tax)
+            self.assertAlmostEqual(abs(values["base"]), invoice.amount_untaxed)
+            total_amount = invoice._prepare_datev_xml_total_amount(
+                {"mode": "extended", "tax_summaries": summaries}
+            )
+            self.assertAlmostEqual(
+                total_amount["tax_line"][0]["tax_amount"], invoice.amount_tax
+            )
+
+    def test_bedi_exclude_unchanged(self):
+        export = self.interface.create(
+            {
+                "mode": "datev_xml",
+                "xml_mode": "bedi",
+                "xml_invoices": "both",
+                "exclude_bedi_exported": True,
+                "start_date": fields.Date.from_string("2024-01-01"),
+                "end_date": fields.Date.from_string("2024-01-31"),
+            }
+        )
+
+        def prepare_vals():
+            vals = {
+                "moves_ok": self.invoices,
+                "move_xmls": [b"<invoice/>" for _invoice in self.invoices],
+                "attachments": export._classify_invoice_attachments(self.invoices),
+                "error_str": "",
+            }
+            export._prepare_bedi_hashes(vals)
+            return vals
+
+        vals = prepare_vals()
+        self.assertEqual(vals["moves_ok"], self.invoices)
+        export._link_datev_xml_accounts_move("bedi", vals)
+        self.assertEqual(self.invoices.datev_bedi_export_id, export)
+        self.assertEqual(
+            {invoice.id: invoice.datev_bedi_hash for invoice in self.invoices},
+            vals["bedi_hashes"],
+        )
+        with self.assertRaisesRegex(UserError, "No invoice has changed"):
+            prepare_vals()
+        # A new PDF attachment changes the content of the invoice
+        self.env["ir.attachment"].create(
+            {
+                "name": "invoice.pdf",
+                "res_model": self.invoices[1]._name,
+                "res_id": self.invoices[1].id,
+                "mimetype": "application/pdf",
+                "raw": b"%PDF-1.4 changed",
+            }
+        )
+        vals = prepare_vals()
+        self.assertEqual(vals["moves_ok"], self.invoices[1])
+        self.assertEqual(len(vals["move_xmls"]), 1)
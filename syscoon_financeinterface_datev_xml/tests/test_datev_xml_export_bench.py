@@ -0,0 +1,59 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from odoo.addons.syscoon_financeinterface.tests.common import DatevBenchmarkCommon
+from odoo.tests.common import tagged
+
+
+class DatevXmlBenchmarkCommon(DatevBenchmarkCommon):
+    BENCH_MODULE = "syscoon_financeinterface_datev_xml"
+    BENCH_NAME = "datev_xml"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env.company.export_finance_interface = "datev_xml"
+        cls.invoices, cls.payments = cls._generate_bench_data()
+
+    def _measure_xml_export(self, xml_mode):
+        interface = self.env["syscoon.financeinterface"].create(
+            {
+                "mode": "datev_xml",
+                "xml_mode": xml_mode,
+                "xml_invoices": "both",
+                "start_date": self.bench_date,
+                "end_date": self.bench_date.replace(day=31),
+            }
+        )
+        self._measure_export(
+            f"{self.BENCH_NAME}_{xml_mode}",
+            interface._export_datev_xml,
+            len(self.invoices),
+        )
+        return interface
+
+
+@tagged("post_install", "-at_install", "-standard", "datev_bench")
+class TestDatevXmlExportBenchmark(DatevXmlBenchmarkCommon):
+    """Times the DATEV XML export. Run with --test-tags datev_bench"""
+
+    def test_export_datev_xml_standard(self):
+        self._measure_xml_export("standard")
+
+    def test_export_datev_xml_extended(self):
+        self._measure_xml_export("extended")
+
+
+@tagged("post_install", "-at_install", "-standard", "datev_bench")
+class TestDatevXmlLargeInvoiceBenchmark(DatevXmlBenchmarkCommon):
+    """Times the extended DATEV XML export of invoices with many lines, the
+    number of invoices is a tenth of DATEV_BENCH_SCALE"""
+
+    BENCH_NAME = "datev_xml_large_invoice"
+    LINES_PER_INVOICE = 250
+
+    @classmethod
+    def _generate_bench_data(cls, count=None):
+        return super()._generate_bench_data(count or max(cls.bench_scale // 10, 1))
+
+    def test_export_datev_xml_extended(self):
+        self._measure_xml_export("extended")
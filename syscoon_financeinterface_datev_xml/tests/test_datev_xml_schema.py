@@ -0,0 +1,25 @@
+# © 2025 syscoon Estonia OÜ (<https://syscoon.com>)
+# License OPL-1, See LICENSE file for full copyright and licensing details.
+from lxml import etree
+from odoo.addons.syscoon_financeinterface_datev_xml.models.utilities import (
+    DOCUMENT_XSD,
+    INVOICE_XSD,
+    _get_xml_schema,
+    _validate_xml,
+)
+from odoo.tests.common import BaseCase, tagged
+
+
+@tagged("post_install", "-at_install")
+class TestDatevXmlSchema(BaseCase):
+    def test_schema_is_compiled_once(self):
+        self.assertIs(_get_xml_schema(INVOICE_XSD), _get_xml_schema(INVOICE_XSD))
+        self.assertIsNot(_get_xml_schema(INVOICE_XSD), _get_xml_schema(DOCUMENT_XSD))
+
+    def test_validate_element_tree(self):
+        archive = etree.Element(
+            "{http://xml.datev.de/bedi/tps/document/v05.0}archive", version="5.0"
+        )
+        errors = _validate_xml(archive, DOCUMENT_XSD)
+        self.assertEqual(len(errors), 1)
+        self.assertIn("header", errors[0])